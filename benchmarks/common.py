@@ -0,0 +1,31 @@
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot
+import mrsd
+
+# Number of events in parametrized benchmarks
+counts = [10, 100, 1000, 10000, 100000]
+
+# Event constructors, by type, as functions of the begin time
+factories = {
+    "ADC": lambda t: mrsd.ADC(1, begin=t),
+    "Echo": lambda t: mrsd.Echo(1, 1, begin=t),
+    "Gradient": lambda t: mrsd.Gradient(1, 1, ramp=0.1, begin=t),
+    "MultiGradient": lambda t: mrsd.MultiGradient(1, 1, ramp=0.1, begin=t),
+    "RFPulse": lambda t: mrsd.RFPulse(1, 1, begin=t),
+}
+
+def events(type_, count):
+    """ Return a list of non-overlapping events of the given type.
+    """
+    
+    return [factories[type_](1.5*i) for i in range(count)]
+
+def diagram(collections=False):
+    """ Return a diagram with a single channel, in a new figure.
+    """
+    
+    matplotlib.pyplot.close("all")
+    figure, plot = matplotlib.pyplot.subplots()
+    return mrsd.Diagram(plot, ["Channel"], collections)
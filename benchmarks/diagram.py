@@ -0,0 +1,58 @@
+import copy
+
+from .common import counts, diagram, events, factories
+
+class Add:
+    """ Addition of events to a diagram, and update of its limits
+    """
+    
+    params = (counts, list(factories))
+    param_names = ["count", "type"]
+    timeout = 300
+    # Events can only be added once: run the setup before each measurement
+    number = 1
+    repeat = (1, 5, 60.0)
+    
+    def setup(self, count, type_):
+        self.diagram = diagram()
+        self.events = events(type_, count)
+    
+    def time_add(self, count, type_):
+        for event in self.events:
+            self.diagram.add("Channel", event)
+    
+    def time_extend(self, count, type_):
+        self.diagram.extend("Channel", self.events)
+    
+    def time_extend_collections(self, count, type_):
+        self.diagram._use_collections = True
+        self.diagram.extend("Channel", self.events)
+    
+    def time_autoscale(self, count, type_):
+        self.diagram.extend("Channel", self.events)
+        self.diagram.plot.relim()
+        self.diagram.plot.autoscale_view()
+
+class Repeat:
+    """ Time-shifted copies of a block of events
+    """
+    
+    params = ([10, 100, 1000, 10000],)
+    param_names = ["copies"]
+    timeout = 300
+    number = 1
+    repeat = (1, 5, 60.0)
+    
+    def setup(self, copies):
+        self.diagram = diagram()
+        self.block = [
+            ("Channel", x) for x in events("Gradient", 5)+events("RFPulse", 5)]
+        self.offsets = [20*(1+i) for i in range(copies)]
+    
+    def time_repeat(self, copies):
+        self.diagram.repeat(self.block, self.offsets)
+    
+    def time_copy_and_add(self, copies):
+        for offset in self.offsets:
+            for channel, event in self.block:
+                self.diagram.add(channel, copy.copy(event).move(offset))
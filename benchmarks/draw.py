@@ -0,0 +1,28 @@
+import io
+
+from .common import counts, diagram, events
+
+class Draw:
+    """ Rendering of diagrams with the Agg and SVG backends, drawn with one
+        patch per event or with collections
+    """
+    
+    params = (counts, ["Gradient", "RFPulse"], [False, True])
+    param_names = ["count", "type", "collections"]
+    timeout = 600
+    
+    def setup(self, count, type_, collections):
+        self.diagram = diagram(collections)
+        self.diagram.extend("Channel", events(type_, count))
+        self.figure = self.diagram.plot.figure
+        # First draw: paths and layout are computed
+        self.figure.canvas.draw()
+    
+    def time_draw_agg(self, count, type_, collections):
+        self.figure.canvas.draw()
+    
+    def time_save_svg(self, count, type_, collections):
+        self.figure.savefig(io.BytesIO(), format="svg")
+    
+    def peakmem_draw_agg(self, count, type_, collections):
+        self.figure.canvas.draw()
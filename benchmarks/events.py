@@ -0,0 +1,39 @@
+import copy
+import tracemalloc
+
+from .common import counts, events, factories
+
+class Events:
+    """ Construction, copy and path generation of events
+    """
+    
+    params = (counts, list(factories))
+    param_names = ["count", "type"]
+    timeout = 300
+    
+    def setup(self, count, type_):
+        self.events = events(type_, count)
+    
+    def time_construct(self, count, type_):
+        events(type_, count)
+    
+    def time_copy(self, count, type_):
+        [copy.copy(x) for x in self.events]
+    
+    def time_move(self, count, type_):
+        [x.move(1) for x in self.events]
+    
+    def time_get_path(self, count, type_):
+        # Bypass the cache of paths
+        [x._get_path() for x in self.events]
+    
+    def track_memory_per_event(self, count, type_):
+        tracemalloc.start()
+        try:
+            events_ = events(type_, count)
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size/len(events_)
+    
+    track_memory_per_event.unit = "bytes"
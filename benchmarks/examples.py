@@ -0,0 +1,36 @@
+import os
+import runpy
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.pyplot
+
+# Sequences of the examples directory, as realistic workloads
+directory = os.path.join(os.path.dirname(__file__), "..", "examples")
+names = sorted(
+    os.path.splitext(x)[0] for x in os.listdir(directory) if x.endswith(".py"))
+
+class Examples:
+    """ Build and draw the example sequences
+    """
+    
+    params = (names,)
+    param_names = ["example"]
+    
+    def setup(self, name):
+        matplotlib.pyplot.close("all")
+        matplotlib.pyplot.show = lambda *args, **kwargs: None
+    
+    def _run(self, name):
+        runpy.run_path(os.path.join(directory, f"{name}.py"))
+        return matplotlib.pyplot.gcf()
+    
+    def time_build(self, name):
+        self._run(name)
+    
+    def time_build_and_draw(self, name):
+        self._run(name).canvas.draw()
+    
+    def peakmem_build_and_draw(self, name):
+        self._run(name).canvas.draw()
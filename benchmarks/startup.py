@@ -0,0 +1,19 @@
+# Import times, measured in a fresh interpreter for each sample
+
+def timeraw_import_mrsd():
+    return "import mrsd"
+
+def timeraw_import_sequence():
+    return "import mrsd; mrsd.Sequence"
+
+def timeraw_import_diagram():
+    return "import mrsd; mrsd.Diagram"
+
+def track_import_loads_matplotlib():
+    import subprocess
+    import sys
+    
+    # 1 if importing mrsd loads matplotlib, 0 otherwise
+    return int(subprocess.check_output([
+        sys.executable, "-c",
+        "import sys, mrsd; print(int('matplotlib' in sys.modules))"]))
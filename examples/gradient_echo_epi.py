@@ -18,21 +18,16 @@ excitation, slice_selection = diagram.selective_pulse(
 diagram.add(
     "$G_z$", slice_selection.adapt(1, -0.5, ramp, begin=slice_selection.end))
 
-polarity = +1
 center = epi_factor//2
-begin, end = -center, epi_factor-center
-for index in range(begin, end):
-    t = index*(readout_duration+2*ramp)
-    adc, echo, readout = diagram.readout(
-        "ADC", "$G_x$", readout_duration, numpy.exp(-numpy.abs(t)/3), polarity,
-        ramp, center=TE+t, adc_kwargs={"alpha": 0.5})
-    
-    if index == begin:
-        diagram.gradient("$G_y$", readout_duration, -1, ramp, end=readout.begin)
-    if index != end-1:
-        diagram.gradient("$G_y$", ramp, +1, 0, begin=adc.end)
-    
-    polarity *= -1
+index = numpy.arange(-center, epi_factor-center)
+t = index*(readout_duration+2*ramp)
+polarity = (-1)**(index-index[0])
+adcs, echoes, readouts = diagram.readout_train(
+    "ADC", "$G_x$", readout_duration, numpy.exp(-numpy.abs(t)/3), polarity,
+    ramp, center=TE+t, adc_kwargs={"alpha": 0.5})
+
+diagram.gradient("$G_y$", readout_duration, -1, ramp, end=readouts[0].begin)
+diagram.gradient_train("$G_y$", ramp, +1, 0, begin=[x.end for x in adcs[:-1]])
 
 diagram.add("RF", copy.copy(excitation).move(TR))
 diagram.add("$G_z$", copy.copy(slice_selection).move(TR))
@@ -38,7 +38,9 @@ setuptools.setup(
     packages=["mrsd"],
     package_dir={"mrsd": "src/mrsd"},
     
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     
-    install_requires=["matplotlib>=3.3", "numpy"],
+    install_requires=["matplotlib>=3.4", "numpy"],
+    
+    entry_points={"console_scripts": ["mrsd-render=mrsd.render:main"]},
 )
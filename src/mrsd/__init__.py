@@ -1,8 +1,43 @@
-from .event import Event
-from .adc import ADC
-from .echo import Echo
-from .gradient import Gradient
-from .multi_gradient import MultiGradient
-from .rf_pulse import RFPulse, box_envelope, gaussian_envelope, sinc_envelope
-
-from .diagram import Diagram
+import importlib
+
+# Public names, by module. A module is only imported when one of its names is
+# first accessed: e.g. using mrsd.Sequence does not import matplotlib.
+_exports = {
+    "event": ["Event"],
+    "adc": ["ADC"],
+    "echo": ["Echo"],
+    "gradient": ["Gradient"],
+    "multi_gradient": ["MultiGradient"],
+    "sampled_gradient": ["SampledGradient"],
+    "rf_pulse": [
+        "RFPulse", "array_envelope", "box_envelope", "gaussian_envelope",
+        "sinc_envelope"],
+    "sequence": ["Record", "Sequence"],
+    "diagram": ["Diagram"],
+}
+_modules = {
+    name: module for module, names in _exports.items() for name in names}
+
+# Sub-modules, also imported when first accessed (e.g. mrsd.rf_pulse)
+_submodules = [
+    *_exports, "cache", "channel", "collection", "index", "moments", "panels",
+    "parametric", "profiling", "pulseq", "render", "sampling", "storage",
+    "table"]
+
+__all__ = list(_modules)
+
+def __getattr__(name):
+    if name in _submodules:
+        # Importing the sub-module binds it in the package
+        return importlib.import_module(f".{name}", __name__)
+    
+    module = _modules.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | set(_submodules))
@@ -1,7 +1,11 @@
 import matplotlib.path
+import numpy
 
 from .event import Event
 
+# Normalized waveform of all ADC events
+_waveform = (numpy.array([0., 0., 1., 1.]), numpy.array([0., 1., 1., 0.]))
+
 class ADC(Event):
     """ ADC/readout event, represented by a rectangle of amplitude 1.
     """
@@ -9,13 +13,16 @@ class ADC(Event):
     def __init__(self, duration, **kwargs):
         super().__init__(duration, 1, **kwargs)
     
-    def get_path(self):
+    def _get_path(self):
         return matplotlib.path.Path([
             [self.begin, 0],
             [self.begin, self.amplitude],
             [self.begin+self.duration, self.amplitude],
             [self.begin+self.duration, 0]])
     
+    def _waveform(self):
+        return _waveform
+    
     @property
     def _fields(self):
         return {x: getattr(self, x) for x in ["duration", "begin"]}
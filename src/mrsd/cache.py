@@ -0,0 +1,289 @@
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+class RenderCache(object):
+    """ Content-addressed cache of rendered figures, stored in a directory.
+        
+        Each entry is a set of files identified by a key, the hash of
+        everything that defines them (see :meth:`key`). When the total size of
+        the cache exceeds its maximal size, the least recently used entries
+        are removed.
+        
+        :param directory: directory of the cache, created if needed
+        :param max_size: maximal size of the cache, in bytes (defaults to
+            256 MiB)
+    """
+    
+    def __init__(self, directory, max_size=256*2**20):
+        # Renderings may change the working directory
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+    
+    @staticmethod
+    def key(*parts):
+        """ Return the key of an entry defined by the given parts (bytes or
+            JSON-serializable values), the version of matplotlib and the
+            source code of mrsd.
+        """
+        
+        digest = hashlib.sha256()
+        for part in [*_versions(), *parts]:
+            if not isinstance(part, bytes):
+                part = json.dumps(part, sort_keys=True, default=repr).encode()
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+    
+    def load(self, key, destination):
+        """ Copy the files of an entry to a directory, return their paths or
+            None if the entry is not in the cache.
+        """
+        
+        entry = self._entry(key)
+        try:
+            names = sorted(os.listdir(entry))
+        except FileNotFoundError:
+            return None
+        
+        paths = []
+        for name in names:
+            paths.append(os.path.join(destination, name))
+            shutil.copyfile(os.path.join(entry, name), paths[-1])
+        # Mark the entry as recently used
+        os.utime(entry)
+        
+        return paths
+    
+    def store(self, key, paths):
+        """ Store files in the cache, as a single entry, and evict the least
+            recently used entries if the cache is too large.
+        """
+        
+        # Build the entry aside, so that concurrent readers never see a
+        # partial entry
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        temporary = tempfile.mkdtemp(prefix=".", dir=os.path.dirname(entry))
+        for path in paths:
+            shutil.copyfile(
+                path, os.path.join(temporary, os.path.basename(path)))
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            # Entry stored by another process
+            shutil.rmtree(temporary)
+        
+        self.evict()
+    
+    def evict(self):
+        """ Remove the least recently used entries until the cache is smaller
+            than its maximal size.
+        """
+        
+        entries = []
+        for prefix in os.listdir(self.directory):
+            for key in os.listdir(os.path.join(self.directory, prefix)):
+                if key.startswith("."):
+                    # Entry being stored
+                    continue
+                entry = os.path.join(self.directory, prefix, key)
+                try:
+                    size = sum(
+                        os.path.getsize(os.path.join(entry, x))
+                        for x in os.listdir(entry))
+                    entries.append((os.path.getmtime(entry), size, entry))
+                except FileNotFoundError:
+                    # Entry removed by another process
+                    pass
+        
+        total = sum(x[1] for x in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+    
+    def remove(self, key):
+        """ Remove an entry, if it is in the cache.
+        """
+        
+        shutil.rmtree(self._entry(key), ignore_errors=True)
+    
+    def size(self):
+        """ Return the total size of the files in the cache, in bytes.
+        """
+        
+        return sum(
+            os.path.getsize(os.path.join(root, x))
+            for root, _, files in os.walk(self.directory) for x in files)
+    
+    def _entry(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+def figure_key(diagram, path, **kwargs):
+    """ Return the key of a figure saved by :meth:`mrsd.Diagram.savefig`: the
+        description of the diagram (events, styles, annotations and
+        intervals), the size, resolution and layout of the figure, the
+        matplotlib settings (rcParams), the placement, limits, titles, axis
+        labels and legends of the axes, the other artists of the figure (e.g.
+        lines, texts, patches, collections and images added directly to the
+        axes), the name of the file and the parameters of savefig.
+    """
+    
+    from . import storage
+    from .collection import EventCollection
+    from .event import Event
+    
+    plot = diagram.plot
+    figure = plot.figure
+    metadata, events = storage.describe(diagram)
+    
+    # The position of the axes may change when the figure is drawn: use the
+    # parameters of the layout instead
+    engine = getattr(figure, "get_layout_engine", lambda: None)()
+    layout = (
+        [type(engine).__name__, engine.get()] if engine is not None
+        else figure.get_tight_layout())
+    
+    # The events of the diagram are in its description
+    axes = [
+        _axes(x, (Event, EventCollection) if x is plot else ())
+        for x in figure.axes]
+    
+    return RenderCache.key(
+        storage._plain([metadata, events]),
+        list(figure.get_size_inches()), kwargs.get("dpi", figure.dpi), layout,
+        _settings(), figure.axes.index(plot), axes,
+        [
+            _artist(x) for x in [
+                figure.patch, *figure.texts, *figure.lines, *figure.patches,
+                *figure.images]],
+        [_legend(x) for x in figure.legends],
+        os.path.basename(path), kwargs)
+
+# Properties describing the appearance of artists, when they have a getter
+_properties = [
+    "visible", "zorder", "alpha", "label", "text", "position", "xy",
+    "xydata", "path", "paths", "patch_transform", "offsets", "sizes",
+    "array", "extent", "cmap", "clim", "color", "facecolor", "edgecolor",
+    "linewidth", "linestyle", "marker", "markersize", "hatch", "fontsize",
+    "fontfamily", "fontweight", "fontstyle", "rotation",
+    "horizontalalignment", "verticalalignment"]
+
+# Properties of the artists placed when the figure is drawn (e.g. axis labels
+# and legends), which are not part of their description
+_placement = [
+    "position", "xy", "xydata", "path", "paths", "patch_transform", "offsets",
+    "extent"]
+
+def _artist(artist, placed=False):
+    """ Return a JSON-serializable description of an artist, without its
+        geometry if it is placed when the figure is drawn.
+    """
+    
+    description = [type(artist).__name__]
+    for name in _properties:
+        if placed and name in _placement:
+            continue
+        getter = getattr(artist, f"get_{name}", None)
+        if getter is not None:
+            description.append([name, _value(getter())])
+    return description
+
+def _axes(plot, skipped):
+    """ Return a JSON-serializable description of axes, without the artists
+        of the skipped types.
+    """
+    
+    subplot = getattr(plot, "get_subplotspec", lambda: None)()
+    return [
+        subplot.get_geometry() if subplot is not None
+            else plot.get_position(original=True).bounds,
+        plot.get_xlim(), plot.get_ylim(), plot.get_xscale(),
+        plot.get_yscale(), plot.axison, _value(plot.get_xticks()),
+        _value(plot.get_yticks()),
+        [x.get_visible() for x in plot.spines.values()],
+        [plot.get_title(x) for x in ["left", "center", "right"]],
+        [
+            _artist(x, True) for x in [
+                plot.title, plot.xaxis.label, plot.yaxis.label]],
+        [
+            _artist(x) for x in [
+                plot.patch, *plot.lines, *plot.texts, *plot.patches,
+                *plot.collections, *plot.images, *plot.artists, *plot.tables]
+            if not isinstance(x, skipped)],
+        _legend(plot.get_legend())]
+
+def _legend(legend):
+    if legend is None:
+        return None
+    return [
+        # The location of the legend has no public getter
+        repr(getattr(legend, "_loc", None)),
+        [
+            _artist(x, True) for x in [
+                legend.get_frame(), *legend.get_texts(), *legend.get_lines(),
+                *legend.get_patches()]]]
+
+def _settings():
+    """ Return the matplotlib settings which may change the figures.
+    """
+    
+    import matplotlib
+    
+    # Reading the backend may select it
+    return {
+        name: _value(matplotlib.rcParams[name])
+        for name in sorted(matplotlib.rcParams)
+        if not name.startswith("backend")}
+
+def _value(value):
+    """ Return a JSON-serializable and reproducible description of a value,
+        hashing arrays.
+    """
+    
+    import matplotlib.colors
+    import matplotlib.path
+    import matplotlib.transforms
+    import numpy
+    
+    if isinstance(value, matplotlib.path.Path):
+        return [_value(value.vertices), _value(value.codes)]
+    elif isinstance(value, matplotlib.transforms.Transform):
+        return (
+            _value(value.get_matrix()) if value.is_affine
+            else type(value).__name__)
+    elif isinstance(value, matplotlib.colors.Colormap):
+        return value.name
+    elif isinstance(value, numpy.ndarray):
+        if value.dtype == object:
+            return [_value(x) for x in value.tolist()]
+        digest = hashlib.sha256(numpy.ascontiguousarray(value).tobytes())
+        if numpy.ma.isMaskedArray(value):
+            digest.update(numpy.ma.getmaskarray(value).tobytes())
+        return [value.shape, value.dtype.str, digest.hexdigest()]
+    elif isinstance(value, (list, tuple)):
+        return [_value(x) for x in value]
+    else:
+        return value
+
+@functools.lru_cache(maxsize=1)
+def _versions():
+    """ Return the version of matplotlib and the hash of the source code of
+        mrsd, which also changes during development.
+    """
+    
+    import matplotlib
+    
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".py"):
+            with open(os.path.join(directory, name), "rb") as fd:
+                digest.update(fd.read())
+    
+    return matplotlib.__version__, digest.hexdigest()
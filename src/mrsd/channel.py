@@ -0,0 +1,38 @@
+import matplotlib.transforms
+
+class Channel(object):
+    """ Row of a diagram. The events of a channel are defined around 0 and
+        share the transform of the channel, which places them at its vertical
+        position: moving a channel only updates this transform, not its events.
+        
+        :param name: name of the channel
+        :param y: vertical position of the center of the channel
+    """
+    
+    def __init__(self, name, y=0):
+        self.name = name
+        self.visible = True
+        self.transform = matplotlib.transforms.Affine2D()
+        
+        # Extent of the events, around 0
+        self.extent = matplotlib.transforms.Bbox.null()
+        # Background line of the channel
+        self.line = None
+        # Texts of the annotations of the channel
+        self.annotations = []
+        
+        self.y = y
+    
+    @property
+    def y(self):
+        """ Vertical position of the center of the channel.
+        """
+        
+        return self._y
+    
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self.transform.clear().translate(0, value)
+        if self.line is not None:
+            self.line.set_ydata([value, value])
@@ -0,0 +1,143 @@
+import matplotlib.collections
+
+class EventCollection(matplotlib.collections.Collection):
+    """ Draw several events with a single artist. The events are not added to
+        the axes: they only provide the geometry and the style of the elements
+        of the collection, and can still be modified or removed individually.
+        
+        All events of a collection must share the properties which cannot vary
+        within a matplotlib collection (z-order, hatch, join and cap styles),
+        see :meth:`style_key`.
+        
+        If the table and the channel of the events are specified, only the
+        events intersecting the x-limits of the axes are drawn, and their level
+        of detail is adapted to their width on screen (see
+        :meth:`mrsd.Event.get_display_path`).
+        
+        The paths of the collection are in the coordinates of the channel of
+        the events: the transform of the collection, shared with the channel
+        (see :class:`mrsd.channel.Channel`), places them in the axes.
+        
+        :param key: style key of the events
+        :param table: :class:`mrsd.table.EventTable` containing the events
+        :param channel: channel of the events in the table
+    """
+    
+    def __init__(self, key, table=None, channel=None, **kwargs):
+        zorder, hatch, joinstyle, capstyle = key
+        super().__init__(
+            zorder=zorder, hatch=hatch, joinstyle=joinstyle, capstyle=capstyle,
+            **kwargs)
+        
+        self.events = []
+        self._ids = set()
+        self._table = table
+        self._channel = channel
+        
+        self._paths = []
+        self._dirty = False
+        # View (x-limits and scale) of the current paths
+        self._view = None
+    
+    @staticmethod
+    def style_key(event):
+        """ Return the properties shared by all events of a collection.
+        """
+        
+        return (
+            event.get_zorder(), event.get_hatch(), event.get_joinstyle(),
+            event.get_capstyle())
+    
+    def add_event(self, event):
+        """ Add an event to the collection.
+        """
+        
+        self.events.append(event)
+        self._ids.add(id(event))
+        event._remove_method = self.remove_event
+        event.stale_callback = self._event_changed
+        self._event_changed(event, True)
+    
+    def remove_event(self, event):
+        """ Remove an event from the collection.
+        """
+        
+        self.events.remove(event)
+        self._ids.discard(id(event))
+        self._event_changed(event, True)
+    
+    def invalidate(self):
+        """ Gather the geometry and the style of the events at the next draw,
+            e.g. after a change of visibility of their channel.
+        """
+        
+        self._event_changed(None, True)
+    
+    def get_paths(self):
+        self._update()
+        return self._paths
+    
+    def draw(self, renderer):
+        self._update()
+        if not self._paths:
+            return
+        super().draw(renderer)
+    
+    def _event_changed(self, event, value):
+        # Propagating the staleness is only needed once until the next draw
+        if value and not (self._dirty and self.stale):
+            self._dirty = True
+            self.stale = True
+    
+    def _get_view(self):
+        """ Return the x-limits and the horizontal scale (in pixels per time
+            unit) of the axes, or None if the events are not culled.
+        """
+        
+        if self.axes is None or self._table is None:
+            return None
+        
+        x0, x1 = sorted(self.axes.get_xlim())
+        if x1 == x0:
+            return None
+        (p0, _), (p1, _) = self.axes.transData.transform([[x0, 0], [x1, 0]])
+        return x0, x1, abs(p1-p0)/(x1-x0)
+    
+    def _update(self):
+        """ Gather the geometry and the style of the visible events.
+        """
+        
+        view = self._get_view()
+        if not self._dirty and view == self._view:
+            return
+        
+        if view is None:
+            events = [x for x in self.events if x.get_visible()]
+            self._paths = [_local(x, x.get_path()) for x in events]
+        else:
+            x0, x1, scale = view
+            events = [
+                x for x in self._table.get(
+                    self._table.window(self._channel, x0, x1))
+                if id(x) in self._ids and x.get_visible()]
+            self._paths = [
+                _local(x, x.get_display_path(x.duration*scale))
+                for x in events]
+        
+        if events:
+            self.set_facecolor([x.get_facecolor() for x in events])
+            self.set_edgecolor([x.get_edgecolor() for x in events])
+            self.set_linewidth([x.get_linewidth() for x in events])
+            self.set_linestyle([x.get_linestyle() for x in events])
+            self.set_antialiased([x.get_antialiased() for x in events])
+        
+        self._dirty = False
+        self._view = view
+
+def _local(event, path):
+    """ Return the path of an event in the coordinates of its channel.
+    """
+    
+    if not event.offset.any():
+        return path
+    return path.transformed(event.get_offset_transform())
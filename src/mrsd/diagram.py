@@ -1,15 +1,27 @@
+import contextlib
 import copy
+import os
 
-import matplotlib.pyplot
+import matplotlib.animation
+import matplotlib.collections
 import matplotlib.ticker
+import matplotlib.transforms
 import numpy
 
 from .adc import ADC
+from .cache import figure_key
+from .channel import Channel
+from .collection import EventCollection
 from .echo import Echo
+from .event import Event
 from .gradient import Gradient
 from .multi_gradient import MultiGradient
-from . import rf_pulse
+from .profiling import Stats
+from . import moments, panels, parametric, rf_pulse, sampling, storage
 from .rf_pulse import RFPulse
+from .sampled_gradient import SampledGradient
+from .sequence import resolve_begin, to_event
+from .table import EventTable
 
 class Diagram(object):
     """ MR sequence diagram
@@ -17,43 +29,601 @@ class Diagram(object):
         :param plot: an instance of matplotlib axes (plot, subplot, etc.)
         :param channels: sequence of channels names in the plot, from top to
             bottom
+        :param collections: if True, draw the events of each channel with a
+            single matplotlib collection per style group instead of one patch
+            per event. This is faster for diagrams with many events.
     """
     
-    def __init__(self, plot, channels):
+    def __init__(self, plot, channels, collections=False):
         self._channel_height = 2
         self._channel_gap = 0.2
         
         self.plot = plot
         self.plot.spines[:].set_visible(False)
         
-        self._channels = { 
-            x: i*(self._channel_height+self._channel_gap)
-            for i, x in enumerate(channels[::-1]) }
+        # Channels from top to bottom, and names of the visible channels from
+        # bottom to top, i.e. by row
+        self._channels = {x: Channel(x) for x in channels}
+        self._rows = []
         
         self.plot.xaxis.set_major_locator(matplotlib.ticker.NullLocator())
         self.plot.xaxis.set_minor_locator(matplotlib.ticker.NullLocator())
         
-        self.plot.yaxis.set_major_locator(
-            matplotlib.ticker.FixedLocator(sorted(self._channels.values())))
+        self._place()
         self.plot.yaxis.set_minor_locator(matplotlib.ticker.NullLocator())
         def channel_formatter(x, pos):
-            distances = [numpy.abs(x-value) for value in self._channels.values()]
-            return list(self._channels.keys())[numpy.argmin(distances)]
+            return self._channel_at(x) or ""
         self.plot.yaxis.set_major_formatter(channel_formatter)
         self.plot.yaxis.set_tick_params(length=0, width=0)
         
         self._background_line_style = {"color": "0.9", "lw": 1, "zorder": -1}
         
-        for y in self._channels.values():
-            self.plot.axhline(y, **self._background_line_style)
+        # Events added in batch mode, registered when the batch ends
+        self._batch_depth = 0
+        self._pending = []
+        
+        # Collections of events, by channel and style
+        self._use_collections = collections
+        self._collections = {}
+        
+        for channel in reversed(list(self._channels.values())):
+            channel.line = self.plot.axhline(
+                channel.y, **self._background_line_style)
+        
+        # Columnar store of the events, for vectorized queries
+        self.table = EventTable(channels)
+        
+        # Instrumentation, enabled by profile
+        self._stats = Stats()
+        self._profiling = 0
+        
+        # Parameters of the annotations and intervals, saved with the events,
+        # and number of rows of the table when they were added
+        self._annotations = []
+        self._intervals = []
+        # Parameters and artists of the intervals, updated with the layout
+        self._interval_artists = []
+        
+        # Tooltip and callbacks, see enable_hover
+        self._hover = None
+        
+        # Parameters and templates, see template and set_params
+        self._template = parametric.Template(self)
+        self.params = self._template.params
+        # Template node being run, which captures the new events
+        self._capture = None
+    
+    def save(self, path):
+        """ Save the diagram (channels, events, annotations and intervals), as
+            JSON or, if the path ends with ".npz", as compressed NumPy columns
+            for large diagrams (see :func:`mrsd.storage.save`).
+        """
+        
+        storage.save(self, path)
+    
+    def savefig(self, path, cache=None, **kwargs):
+        """ Save the figure of the diagram. If a cache is specified, the
+            figure is only rendered if it is not in the cache, otherwise the
+            file is copied from the cache.
+            
+            The key of the figure covers the content of the diagram, the
+            figure size, resolution, axes and matplotlib settings, as well as
+            the other artists of the figure (see :func:`mrsd.cache.figure_key`).
+            
+            :param path: path to the file
+            :param cache: :class:`mrsd.cache.RenderCache` or None
+            :param kwargs: extra parameters passed to
+                matplotlib.figure.Figure.savefig
+            :return: True if the file was copied from the cache
+        """
+        
+        figure = self.plot.figure
+        if cache is None:
+            figure.savefig(path, **kwargs)
+            return False
+        
+        key = figure_key(self, path, **kwargs)
+        if cache.load(key, os.path.dirname(path) or ".") is not None:
+            return True
+        figure.savefig(path, **kwargs)
+        cache.store(key, [path])
+        return False
+    
+    @classmethod
+    def load(cls, plot, path):
+        """ Load a diagram saved by :meth:`save`, or a Pulseq sequence
+            (.seq, see :func:`mrsd.pulseq.load`).
+            
+            :param plot: an instance of matplotlib axes (plot, subplot, etc.)
+            :param path: path to the file
+        """
+        
+        return storage.load(plot, path)
+    
+    @classmethod
+    def sweep(cls, builder, grid, channels, **kwargs):
+        """ Draw a sequence for each point of a parameter grid, as small
+            multiples (see :func:`mrsd.panels.sweep`).
+            
+            :param builder: function adding the events to a diagram, using
+                :meth:`template` for the events depending on the parameters
+            :param grid: sequence of parameters (dictionaries), or dictionary
+                of parameter names to values
+            :param channels: channels of the diagrams
+            :param kwargs: passed to :func:`mrsd.panels.sweep`
+        """
+        
+        return panels.sweep(builder, grid, channels, **kwargs)
+    
+    def template(self, function, *args, **kwargs):
+        """ Call a function adding events to the diagram (e.g. a method of
+            the diagram), whose arguments may contain parameters of the
+            diagram (:attr:`params`), expressions of parameters, and handles
+            of events created by other templates or their attributes. The
+            dependencies are recorded, and the events are updated when the
+            parameters change (see :meth:`set_params`). For example, with
+            ``adc, echo, readout = diagram.template(diagram.readout, "Signal",
+            "Readout", 2, center=diagram.params.TE)``, the gradient created by
+            ``diagram.template(diagram.gradient, "Phase", 1, 1,
+            end=readout.begin)`` follows the readout when TE changes.
+            
+            Annotations and intervals added by the function are also
+            replaced when the parameters change.
+            
+            :return: the result of the function, where the events are
+                replaced by handles (see :class:`mrsd.parametric.Handle`)
+        """
+        
+        return self._template.add(function, args, kwargs)
+    
+    def set_params(self, **values):
+        """ Define or update parameters of the diagram. Only the templates
+            depending on the modified parameters, directly or through other
+            templates, are run again: their events are updated in place, or
+            replaced if the function created different events (e.g. another
+            number of gradients in a train).
+            
+            :return: the modified events
+        """
+        
+        return self._template.set(values)
+    
+    def channel(self, name):
+        """ Return a channel of the diagram (see
+            :class:`mrsd.channel.Channel`).
+        """
+        
+        return self._channels[name]
+    
+    def add_channel(self, name, index=None):
+        """ Add an empty channel.
+            
+            :param name: name of the channel
+            :param index: position of the channel, from the top, default to
+                the bottom
+        """
+        
+        if name in self._channels:
+            raise Exception(f"Channel already exists: {name}")
+        
+        channel = Channel(name)
+        channel.line = self.plot.axhline(0, **self._background_line_style)
+        self._channels[name] = channel
+        self.table.add_channel(name)
+        
+        self.move_channel(
+            name, len(self._channels)-1 if index is None else index)
+    
+    def move_channel(self, name, index):
+        """ Move a channel to another position. The cost does not depend on
+            the number of events, which follow the transform of their channel.
+            
+            :param name: name of the channel
+            :param index: new position of the channel, from the top
+        """
+        
+        channel = self._channels.pop(name)
+        names = list(self._channels)
+        names.insert(index, name)
+        self._channels = {
+            x: (channel if x == name else self._channels[x]) for x in names}
+        self._update_layout()
+    
+    def hide_channel(self, name, hidden=True):
+        """ Hide or show a channel and its events. The following channels
+            are moved to fill the place of a hidden channel.
+            
+            :param name: name of the channel
+            :param hidden: whether the channel is hidden or shown
+        """
+        
+        channel = self._channels[name]
+        channel.visible = not hidden
+        channel.line.set_visible(not hidden)
+        channel.annotations = [
+            x for x in channel.annotations if x.axes is not None]
+        for annotation in channel.annotations:
+            annotation.set_visible(not hidden)
+        for (collection_channel, _), collection in self._collections.items():
+            if collection_channel == name:
+                collection.invalidate()
+        self._update_layout()
     
     def add(self, channel, event):
         """ Add an event to the specified channel.
         """
         
-        event.offset[1] += self._channels[channel]
-        self.plot.add_patch(event)
-        self.plot.autoscale_view()
+        self._add(channel, event, self._use_collections)
+    
+    def extend(self, channel, events):
+        """ Add several events to the specified channel, return them as a list.
+        """
+        
+        events = list(events)
+        with self.batch():
+            for event in events:
+                self.add(channel, event)
+        return events
+    
+    def render(self, sequence):
+        """ Add the events of a :class:`mrsd.Sequence` to the diagram, return
+            the events in the order of the sequence records.
+        """
+        
+        events = []
+        with self.batch():
+            for record in sequence:
+                event = to_event(record)
+                self.add(record.channel, event)
+                events.append(event)
+        return events
+    
+    def repeat(self, events, offsets):
+        """ Add time-shifted copies of a block of events, e.g. to show the
+            following repetitions of a sequence.
+            
+            :param events: sequence of (channel, event) pairs
+            :param offsets: sequence of time offsets, one per copy of the block
+            :return: list of copies for each offset, in the same order as
+                `events`
+        """
+        
+        events = list(events)
+        copies = []
+        with self.batch():
+            for offset in offsets:
+                block = [copy.copy(event).move(offset) for _, event in events]
+                for (channel, _), event in zip(events, block):
+                    self.add(channel, event)
+                copies.append(block)
+        return copies
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """ Defer the registration of events and the update of the plot limits
+            until the end of the block. The resulting diagram is the same as
+            when adding the events one at a time, but building long sequences
+            no longer requires updating the limits after each event.
+        """
+        
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._flush()
+    
+    @contextlib.contextmanager
+    def profile(self, *hooks):
+        """ Record the number of calls and the cumulative duration of the
+            phases of the diagram in the block: addition of events, batch
+            registration, update of the limits, drawing, and path computations
+            by event type (see :class:`mrsd.profiling.Stats`). Outside of the
+            block, the instrumentation is removed and has no cost.
+            
+            :param hooks: functions called with the name and the duration of
+                each phase, e.g. to feed an external telemetry system
+            :return: the statistics of the diagram, also returned by
+                :meth:`stats`
+        """
+        
+        stats = self._stats
+        stats.hooks.extend(hooks)
+        if self._profiling == 0:
+            # Instance attributes, shadowing the methods
+            self._add = stats.wrap("add", self._add)
+            self._flush = stats.wrap("flush", self._flush)
+            self.plot.autoscale_view = stats.wrap(
+                "autoscale", self.plot.autoscale_view)
+            self.plot.draw = stats.wrap("draw", self.plot.draw)
+            self.table.stats = stats
+        self._profiling += 1
+        try:
+            yield stats
+        finally:
+            self._profiling -= 1
+            for hook in hooks:
+                stats.hooks.remove(hook)
+            if self._profiling == 0:
+                del self._add, self._flush
+                del self.plot.autoscale_view, self.plot.draw
+                self.table.stats = None
+    
+    def stats(self):
+        """ Return the number of events by type, and the number of calls and
+            cumulative duration of the phases recorded by :meth:`profile`.
+        """
+        
+        counts = numpy.bincount(
+            self.table.kind[self.table.alive], minlength=len(self.table.kinds))
+        return {
+            "events": {
+                kind.__name__: int(count)
+                for kind, count in zip(self.table.kinds, counts) if count},
+            "phases": self._stats.as_dict()}
+    
+    def events(self, channel=None, kind=None, begin=None, end=None):
+        """ Return the events matching all the given criteria.
+            
+            :param channel: name of the channel
+            :param kind: event type (e.g. mrsd.Gradient), including sub-classes
+            :param begin,end: time window: only the events intersecting the
+                window are returned
+        """
+        
+        return self.table.get(self.table.select(channel, kind, begin, end))
+    
+    def at(self, channel, time):
+        """ Return the events of a channel which are active at a given time.
+        """
+        
+        return self.table.get(self.table.window(channel, time))
+    
+    def overlaps(self, channel=None, kind=None):
+        """ Return the pairs of overlapping events of the same channel.
+            
+            :param channel: name of the channel (all channels if None)
+            :param kind: event type (e.g. mrsd.Gradient), including sub-classes
+        """
+        
+        return [
+            tuple(self.table.get(x))
+            for x in self.table.overlaps(channel, kind)]
+    
+    def sample(self, channel, dt, begin=None, end=None, kind=None):
+        """ Sample the waveform of a channel on a uniform time grid.
+            
+            :param channel: name of the channel
+            :param dt: sampling period
+            :param begin,end: time range of the samples, default to the begin
+                of the first event and the end of the last event of the channel
+            :param kind: if specified, only sample the events of this type
+                (e.g. mrsd.Gradient), including sub-classes
+            :return: times and values of the samples, as NumPy arrays
+        """
+        
+        begin = self.table.begin_time(channel) if begin is None else begin
+        end = self.table.end_time(channel) if end is None else end
+        if begin is None or end is None:
+            return numpy.zeros(0), numpy.zeros(0)
+        
+        # The end is included despite rounding errors, e.g. 0.7/0.1 < 7
+        count = int(numpy.floor((end-begin)/dt + 1e-9))+1
+        times = begin + dt*numpy.arange(count)
+        return times, sampling.sample(self.table, channel, times, kind)
+    
+    def moment(self, channel, times, order=0, kind=None):
+        """ Return the cumulative gradient moment of a channel at the given
+            times (see :func:`mrsd.moments.moment`).
+            
+            :param channel: name of the channel
+            :param times: evaluation times
+            :param order: order of the moment, 0 or 1
+            :param kind: if specified, only integrate the events of this type
+                (e.g. mrsd.Gradient), including sub-classes
+        """
+        
+        return moments.moment(self.table, channel, times, order, kind)
+    
+    def kspace(
+            self, times, channels=("$G_x$", "$G_y$", "$G_z$"), gamma=1,
+            kind=None):
+        """ Return the k-space trajectory at the given times, as an array of
+            shape (len(times), len(channels)).
+            
+            :param times: evaluation times
+            :param channels: names of the gradient channels
+            :param gamma: gyromagnetic ratio
+            :param kind: if specified, only integrate the events of this type
+                (e.g. mrsd.Gradient), including sub-classes
+        """
+        
+        return moments.kspace(self.table, channels, times, gamma, kind)
+    
+    def plot_kspace(
+            self, plot, times, channels=("$G_x$", "$G_y$"), gamma=1,
+            **kwargs):
+        """ Plot the 2D k-space trajectory at the given times.
+            
+            :param plot: an instance of matplotlib axes
+            :param times: evaluation times
+            :param channels: names of the gradient channels of the horizontal
+                and vertical axes
+            :param gamma: gyromagnetic ratio
+            :param kwargs: extra parameters passed to matplotlib.axes.Axes.plot
+        """
+        
+        trajectory = self.kspace(times, channels, gamma)
+        plot.set(xlabel=channels[0], ylabel=channels[1])
+        return plot.plot(trajectory[:, 0], trajectory[:, 1], **kwargs)
+    
+    def animate(
+            self, times=None, interval=40, cursor_style=None,
+            highlight_style=None, **kwargs):
+        """ Animate a cursor sweeping through the sequence, the events active
+            at the time of the cursor being highlighted. Only the cursor and
+            the highlighted events are redrawn at each frame, the rest of the
+            figure is drawn once (blitting).
+            
+            :param times: times of the frames, default to 200 frames from the
+                begin of the first event to the end of the last event
+            :param interval: delay between frames, in milliseconds
+            :param cursor_style: style of the cursor line (passed to
+                matplotlib.axes.Axes.axvline)
+            :param highlight_style: style of the highlighted events (passed to
+                matplotlib.collections.PathCollection)
+            :param kwargs: extra parameters passed to
+                matplotlib.animation.FuncAnimation
+            :return: the animation, which can be exported by its save method
+                using the matplotlib writers, e.g.
+                ``animation.save("sequence.gif", writer="pillow")`` or
+                ``animation.save("sequence.mp4", writer="ffmpeg")``
+        """
+        
+        self._flush()
+        if times is None:
+            times = numpy.linspace(
+                self.table.begin_time() or 0, self.table.end_time() or 1, 200)
+        
+        cursor = self.plot.axvline(
+            times[0], animated=True,
+            **{"color": "C3", "lw": 1, "zorder": 4, **(cursor_style or {})})
+        highlight = matplotlib.collections.PathCollection(
+            [], animated=True,
+            **{
+                "facecolor": "C1", "edgecolor": "C1", "alpha": 0.4, "lw": 1.5,
+                "zorder": 3, **(highlight_style or {})})
+        self.plot.add_collection(highlight, autolim=False)
+        
+        def update(time):
+            cursor.set_xdata([time, time])
+            # Active events, from the time index of each channel
+            highlight.set_paths([
+                event.get_path().transformed(event.get_patch_transform())
+                for channel in self._rows
+                for event in self.at(channel, time) if event.get_visible()])
+            return cursor, highlight
+        
+        def initialize():
+            highlight.set_paths([])
+            return cursor, highlight
+        
+        return matplotlib.animation.FuncAnimation(
+            self.plot.figure, update, frames=times, init_func=initialize,
+            interval=interval, blit=True, **kwargs)
+    
+    def enable_hover(self, radius=5, **kwargs):
+        """ Show the parameters of the event under the mouse cursor in a
+            tooltip. The event is found with :meth:`hit`, and only the tooltip
+            is redrawn when the mouse moves (blitting), so that the tooltip
+            stays responsive with many events.
+            
+            :param radius: tolerance of the hit test, in pixels
+            :param kwargs: style of the tooltip, passed to
+                matplotlib.axes.Axes.annotate
+            :return: the tooltip, a matplotlib annotation
+        """
+        
+        self.disable_hover()
+        
+        tooltip = self.plot.annotate(
+            "", (0, 0), xytext=(10, 10), textcoords="offset points",
+            animated=True, visible=False,
+            **{
+                "bbox": {"boxstyle": "round", "fc": "white", "alpha": 0.9},
+                "fontsize": "small", "zorder": 5, **kwargs})
+        figure = self.plot.figure
+        # Hovered event and figure without the tooltip
+        state = {"event": None, "background": None}
+        
+        def on_draw(_):
+            if figure.canvas.supports_blit:
+                state["background"] = figure.canvas.copy_from_bbox(
+                    figure.bbox)
+            if tooltip.get_visible():
+                self.plot.draw_artist(tooltip)
+        
+        def on_move(mouse):
+            event = None
+            if mouse.inaxes is self.plot:
+                event = self.hit(mouse.x, mouse.y, radius)
+            if event is None and state["event"] is None:
+                return
+            
+            if event is not None:
+                if event is not state["event"]:
+                    tooltip.set_text(_tooltip(event))
+                tooltip.xy = (mouse.xdata, mouse.ydata)
+            state["event"] = event
+            tooltip.set_visible(event is not None)
+            
+            if state["background"] is None:
+                figure.canvas.draw_idle()
+            else:
+                figure.canvas.restore_region(state["background"])
+                if event is not None:
+                    self.plot.draw_artist(tooltip)
+                figure.canvas.blit(figure.bbox)
+        
+        self._hover = (
+            tooltip,
+            figure.canvas.mpl_connect("draw_event", on_draw),
+            figure.canvas.mpl_connect("motion_notify_event", on_move))
+        
+        return tooltip
+    
+    def disable_hover(self):
+        """ Remove the tooltip added by :meth:`enable_hover`.
+        """
+        
+        if self._hover is None:
+            return
+        
+        tooltip, *connections = self._hover
+        for connection in connections:
+            self.plot.figure.canvas.mpl_disconnect(connection)
+        tooltip.remove()
+        self._hover = None
+    
+    def hit(self, x, y, radius=5):
+        """ Return the event at a position in display coordinates (e.g. the
+            position of a mouse event), or None. The channel is found from the
+            height of the position, the candidate events from the time index
+            of the channel, and only the candidates are tested exactly: an
+            event is hit if its outline is within the radius of the position,
+            or if it is filled and contains the position.
+            
+            :param x,y: position, in pixels
+            :param radius: tolerance, in pixels
+        """
+        
+        self._flush()
+        
+        transform = self.plot.transData
+        (begin, height), (end, _) = transform.inverted().transform(
+            [[x-radius, y], [x+radius, y]])
+        channel = self._channel_at(height)
+        if channel is None:
+            return None
+        
+        # Latest events are drawn on top
+        rows = self.table.window(channel, min(begin, end), max(begin, end))
+        for event in reversed(self.table.get(sorted(rows))):
+            if not event.get_visible():
+                continue
+            path = event.get_path()
+            path_transform = event.get_patch_transform()+transform
+            # The outline is tested in display space, since the paths are
+            # not closed
+            polylines = path.to_polygons(path_transform, closed_only=False)
+            if any(_distance((x, y), p) <= radius for p in polylines):
+                return event
+            filled = event.get_fill() and event.get_facecolor()[3] > 0
+            if filled and path.contains_point((x, y), path_transform):
+                return event
+        
+        return None
     
     def adc(self, channel, *args, **kwargs):
         """ Add an ADC event to the specified channel.
@@ -87,6 +657,14 @@ class Diagram(object):
         self.add(channel, event)
         return event
     
+    def sampled_gradient(self, channel, *args, **kwargs):
+        """ Add a sampled gradient event to the specified channel.
+        """
+        
+        event = SampledGradient(*args, **kwargs)
+        self.add(channel, event)
+        return event
+    
     def rf_pulse(self, channel, *args, **kwargs):
         """ Add an RF pulse event to the specified channel.
         """
@@ -160,6 +738,106 @@ class Diagram(object):
         
         return adc, echo, gradient
     
+    def gradient_train(
+            self, channel, flat_top, amplitude,
+            ramp=0, ramp_up=None, ramp_down=None,
+            begin=None, end=None, center=None, **kwargs):
+        """ Add a train of gradients to the specified channel. The timing of
+            the gradients is computed in a vectorized way, and the train is
+            drawn as a single collection.
+            
+            :param channel: channel of the gradients
+            :param flat_top: duration of the gradient flat-tops
+            :param amplitude: amplitude of the gradient flat-tops (the sign
+                gives the polarity)
+            :param ramp,ramp_up,ramp_down: ramp durations of the gradients.
+                Use `ramp` for symmetric gradients, and both `ramp_up` and
+                `ramp_down` for asymmetric gradients
+            :param begin,end,center: time of the begin, end, or center of the
+                gradients. Only one must be specified.
+            :param kwargs: extra parameters for the gradient events (e.g. style)
+            
+            All parameters except `channel` and `kwargs` are either scalars or
+            arrays, broadcast against each other.
+            
+            :return: list of gradients
+        """
+        
+        ramp_up = ramp_up if ramp_up is not None else ramp
+        ramp_down = ramp_down if ramp_down is not None else ramp
+        ramp_up, flat_top, ramp_down, amplitude, begin = self._train(
+            [ramp_up, flat_top, ramp_down], begin, end, center, amplitude)
+        
+        events = [
+            Gradient(f, a, ramp_up=u, ramp_down=d, begin=b, **kwargs)
+            for f, a, u, d, b in zip(
+                flat_top, amplitude, ramp_up, ramp_down, begin)]
+        with self.batch():
+            for event in events:
+                self._add(channel, event, True)
+        
+        return events
+    
+    def readout_train(
+            self, adc_channel, gradient_channel, duration,
+            echo_amplitude=1, gradient_amplitude=1,
+            ramp=0, ramp_up=None, ramp_down=None, 
+            begin=None, end=None, center=None,
+            adc_kwargs=None, echo_kwargs=None, gradient_kwargs=None):
+        """ Add a train of readout blocks (echo, ADC and gradient), e.g. for
+            EPI or multi-echo sequences. The timing of the blocks is computed
+            in a vectorized way, and the events of each channel are drawn as a
+            single collection.
+            
+            The parameters are the same as :meth:`readout`, but `duration`,
+            `echo_amplitude`, `gradient_amplitude`, the ramps and the times
+            are either scalars or arrays, broadcast against each other.
+            
+            :return: lists of ADCs, echoes and gradients
+        """
+        
+        duration, echo_amplitude, gradient_amplitude, begin = self._train(
+            [duration], begin, end, center, echo_amplitude, gradient_amplitude)
+        center = [b+d/2 for b, d in zip(begin, duration)]
+        
+        with self.batch():
+            adcs = [
+                ADC(d, begin=b, **(adc_kwargs or {}))
+                for d, b in zip(duration, begin)]
+            echoes = [
+                Echo(d, a, begin=b, **(echo_kwargs or {}))
+                for d, a, b in zip(duration, echo_amplitude, begin)]
+            for event in adcs+echoes:
+                self._add(adc_channel, event, True)
+            
+            gradients = self.gradient_train(
+                gradient_channel, duration, gradient_amplitude,
+                ramp, ramp_up, ramp_down, center=center,
+                **(gradient_kwargs or {}))
+        
+        return adcs, echoes, gradients
+    
+    def _train(self, durations, begin, end, center, *parameters):
+        """ Broadcast the parameters of a train and compute the begin times.
+            
+            :param durations: parts of the duration of the elements (e.g.
+                ramps and flat-top), summed to get the total duration
+            :param begin,end,center: time of the begin, end, or center of the
+                elements. Only one must be specified.
+            :param parameters: other parameters of the elements
+            :return: lists of the parts of the durations, of the other
+                parameters, and of the begin times
+        """
+        
+        durations = [numpy.asarray(x, float) for x in durations]
+        begin = resolve_begin(
+            sum(durations),
+            *[None if x is None else numpy.asarray(x, float)
+                for x in [begin, end, center]])
+        return [
+            x.ravel().tolist()
+            for x in numpy.broadcast_arrays(*durations, *parameters, begin)]
+    
     def selective_pulse(
             self, pulse_channel, gradient_channel, duration,
             pulse_amplitude=1, gradient_amplitude=1,
@@ -208,7 +886,16 @@ class Diagram(object):
             :param kwargs: extra parameters passed to matplotlib.axes.Axes.text
         """
         
-        self.plot.text(x, self._channels[channel]+y, text, **kwargs)
+        record = (
+            len(self.table.events),
+            {"channel": channel, "x": x, "y": y, "text": text, **kwargs})
+        # The annotation follows the channel
+        artist = self.plot.text(
+            x, y, text, **{"transform": self._transform(channel), **kwargs})
+        if not self._channels[channel].visible:
+            artist.set_visible(False)
+        self._channels[channel].annotations.append(artist)
+        self._record(self._annotations, record, [artist])
     
     def interval(self, begin, end, y, label, color="k"):
         """ Add a time interval annotation
@@ -219,25 +906,287 @@ class Diagram(object):
             :param color: color of the annotation label
         """
         
+        record = (
+            len(self.table.events),
+            {
+                "begin": begin, "end": end, "y": y, "label": label,
+                "color": color})
+        
+        self._flush()
         self.plot.set(ylim=min(y, self.plot.get_ylim()[0]))
         
-        self.plot.annotate(
-            "", (begin, y), (end, y),
-            arrowprops={
-                "arrowstyle":"<|-|>", "shrinkA": 0, "shrinkB": 0,
-                **self._background_line_style})
-        self.plot.text(
-            (begin+end)/2, y, label,
-            color=color, bbox={"fc": "white", "ec": "none"},
-            horizontalalignment="center", verticalalignment="center")
-        
-        self.plot.vlines(
-            [begin, end],
-            y, self._channel_height/2+max(self._channels.values()),
-            **self._background_line_style)
+        artists = [
+            self.plot.annotate(
+                "", (begin, y), (end, y),
+                arrowprops={
+                    "arrowstyle":"<|-|>", "shrinkA": 0, "shrinkB": 0,
+                    **self._background_line_style}),
+            self.plot.text(
+                (begin+end)/2, y, label,
+                color=color, bbox={"fc": "white", "ec": "none"},
+                horizontalalignment="center", verticalalignment="center")]
+        
+        artists.append(self.plot.vlines(
+            [begin, end], y, self._top(), **self._background_line_style))
+        self._interval_artists.append((record[1], artists))
+        self._record(self._intervals, record, artists)
+    
+    def _record(self, records, record, artists):
+        """ Save the parameters of an annotation or of an interval, and the
+            artists drawing it in the template node being run, if any.
+        """
+        
+        records.append(record)
+        if self._capture is not None:
+            self._capture.records.append((records, record))
+            self._capture.artists.extend(artists)
+    
+    def _add(self, channel, event, collect):
+        """ Add an event to the specified channel, as a patch or in the
+            collection of the channel.
+        """
+        
+        if self._capture is not None:
+            # Added by the template when the node is done
+            self._capture.pending.append((channel, event, collect))
+            return
+        
+        event._channel = self._channels[channel]
+        self.table.append(channel, event)
+        if self._batch_depth > 0:
+            self._pending.append((channel, event, collect))
+        else:
+            self._extend(channel, self._register(channel, event, collect))
+            self.plot.autoscale_view()
+    
+    def _flush(self):
+        """ Register the pending events of a batch and update the limits.
+        """
+        
+        if not self._pending:
+            return
+        
+        pending, self._pending = self._pending, []
+        vertices = {}
+        for channel, event, collect in pending:
+            vertices.setdefault(channel, []).append(
+                self._register(channel, event, collect))
+        for channel, local in vertices.items():
+            self._extend(channel, numpy.concatenate(local))
+        self.plot.autoscale_view()
+    
+    def _register(self, channel, event, collect):
+        """ Add an event to the plot, either as a patch or in the collection of
+            its channel. Return the vertices, in the coordinates of the
+            channel, which must be added to the extent of the channel and to
+            the data limits.
+        """
+        
+        if not collect:
+            self.plot.add_patch(event)
+            return event.get_path().vertices + event.offset
+        
+        key = (channel, EventCollection.style_key(event))
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = EventCollection(
+                key[1], self.table, channel,
+                transform=self._transform(channel))
+            self.plot.add_collection(collection, autolim=False)
+            self._collections[key] = collection
+        collection.add_event(event)
+        
+        # Equivalent to transforming the path by the offset transform
+        return event.get_path().vertices + event.offset
+    
+    def _extend(self, channel, vertices):
+        """ Add vertices, in the coordinates of a channel, to the extent of
+            the channel and to the data limits.
+        """
+        
+        channel = self._channels[channel]
+        channel.extent.update_from_data_xy(vertices, ignore=False)
+        self.plot.update_datalim(vertices + [0, channel.y])
+    
+    def _transform(self, channel):
+        """ Return the transform from the coordinates of a channel to the
+            display.
+        """
+        
+        return self._channels[channel].transform + self.plot.transData
+    
+    def _place(self):
+        """ Place the visible channels from top to bottom, and update the
+            ticks of the y-axis.
+        """
+        
+        step = self._channel_height+self._channel_gap
+        self._rows = [
+            x.name for x in reversed(list(self._channels.values()))
+            if x.visible]
+        for row, name in enumerate(self._rows):
+            self._channels[name].y = row*step
+        self.plot.yaxis.set_major_locator(
+            matplotlib.ticker.FixedLocator(
+                [row*step for row in range(len(self._rows))]))
+    
+    def _channel_at(self, y):
+        """ Return the name of the visible channel closest to a vertical
+            position, or None if no channel is visible.
+        """
+        
+        if not self._rows:
+            return None
+        row = int(round(y/(self._channel_height+self._channel_gap)))
+        return self._rows[min(max(row, 0), len(self._rows)-1)]
+    
+    def _update_layout(self):
+        """ Place the channels after a change of their order or visibility,
+            update the intervals and the data limits. Only the transforms of
+            the channels are modified, not their events.
+        """
+        
+        self._flush()
+        self._place()
+        self._update_intervals()
+        self._update_limits()
+        self.plot.stale = True
+    
+    def _top(self):
+        """ Return the vertical position of the top of the visible channels.
+        """
+        
+        return self._channel_height/2+max(
+            (self.y(x) for x in self._rows), default=0)
+    
+    def _update_intervals(self):
+        """ Extend the vertical lines of the intervals to the top of the
+            visible channels, and place their arrow and label.
+        """
+        
+        # Intervals removed by a template
+        self._interval_artists = [
+            x for x in self._interval_artists if x[1][0].axes is not None]
+        
+        top = self._top()
+        for interval, (arrow, label, lines) in self._interval_artists:
+            begin, end, y = interval["begin"], interval["end"], interval["y"]
+            arrow.xy, arrow.xyann = (begin, y), (end, y)
+            label.set_position(((begin+end)/2, y))
+            lines.set_segments([[[x, y], [x, top]] for x in [begin, end]])
+    
+    def _update_extents(self, channels):
+        """ Compute the extents of channels from their events, e.g. after
+            some of them were modified or removed.
+        """
+        
+        for name in channels:
+            channel = self._channels[name]
+            channel.extent = matplotlib.transforms.Bbox.null()
+            events = self.table.get(self.table.select(name))
+            if events:
+                channel.extent.update_from_data_xy(
+                    numpy.concatenate(
+                        [x.get_path().vertices + x.offset for x in events]),
+                    ignore=False)
+    
+    def _update_limits(self):
+        """ Compute the data limits from the visible channels (their
+            background line and the extent of their events), from the
+            intervals and from the other artists of the plot (e.g. curves
+            drawn by the user), then autoscale. Unlike relim, this does not
+            compute the paths of the events.
+        """
+        
+        self.plot.dataLim.ignore(True)
+        self.plot.dataLim.set_points(
+            matplotlib.transforms.Bbox.null().get_points())
+        self.plot.ignore_existing_data_limits = True
+        for name in self._rows:
+            channel = self._channels[name]
+            self.plot.update_datalim([[0, channel.y]], updatex=False)
+            points = channel.extent.get_points()
+            if numpy.isfinite(points).all():
+                self.plot.update_datalim(points + [0, channel.y])
+        for _, interval in self._intervals:
+            self.plot.update_datalim(
+                [
+                    [interval["begin"], interval["y"]],
+                    [interval["end"], interval["y"]]])
+        
+        # Other artists, as in relim
+        lines = [x.line for x in self._channels.values()]
+        for artist in self.plot.lines:
+            if not any(artist is x for x in lines):
+                self._update_artist_limits(artist)
+        for artist in self.plot.patches:
+            if not isinstance(artist, Event):
+                self._update_artist_limits(artist)
+        for collection in self.plot.collections:
+            if not isinstance(collection, EventCollection):
+                points = collection.get_datalim(
+                    self.plot.transData).get_points()
+                if numpy.isfinite(points).all():
+                    self.plot.update_datalim(points)
+        for image in self.plot.images:
+            left, right, bottom, top = image.get_extent()
+            self.plot.update_datalim([[left, bottom], [right, top]])
+        
+        self.plot.autoscale_view()
+    
+    def _update_artist_limits(self, artist):
+        """ Add the vertices of a line or of a patch to the data limits, on
+            the axes where the artist is in data coordinates.
+        """
+        
+        transform = artist.get_transform()
+        updatex, updatey = transform.contains_branch_seperately(
+            self.plot.transData)
+        if not (updatex or updatey):
+            return
+        
+        points = (transform - self.plot.transData).transform(
+            artist.get_path().vertices)
+        points = points[numpy.isfinite(points).all(axis=1)]
+        if len(points):
+            self.plot.update_datalim(points, updatex, updatey)
     
     def y(self, channel):
         """ Return the y coordinate of the center of a channnel.
         """
         
-        return self._channels[channel]
+        return self._channels[channel].y
+
+def _distance(point, polyline):
+    """ Return the distance between a point and a polyline.
+    """
+    
+    if len(polyline) == 1:
+        return numpy.hypot(*(polyline[0]-point))
+    
+    # Closest point of each segment
+    first, vector = polyline[:-1], numpy.diff(polyline, axis=0)
+    lengths = (vector**2).sum(axis=1)
+    ratios = numpy.clip(
+        ((point-first)*vector).sum(axis=1)/numpy.maximum(lengths, 1e-12),
+        0, 1)
+    closest = first + ratios[:, None]*vector
+    return numpy.hypot(*(closest-point).T).min()
+
+def _tooltip(event):
+    """ Return the description of an event shown by Diagram.enable_hover.
+    """
+    
+    fields = {
+        "begin": event.begin, "end": event.end, "duration": event.duration,
+        "amplitude": event.amplitude, **event._fields}
+    lines = [type(event).__name__]
+    for name, value in fields.items():
+        if value is None:
+            continue
+        elif callable(value):
+            value = getattr(value, "__name__", "custom")
+        elif isinstance(value, (float, numpy.floating)):
+            value = f"{value:g}"
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
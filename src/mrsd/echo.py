@@ -1,7 +1,9 @@
+import functools
+
 import matplotlib.path
 import numpy
 
-from .event import Event
+from .event import Event, display_points
 
 class Echo(Event):
     """ Echo event, represented by an oscillating exponential.
@@ -10,22 +12,46 @@ class Echo(Event):
     def __init__(self, duration, amplitude=1, **kwargs):
         super().__init__(duration, amplitude, **kwargs)
     
-    def get_path(self):
-        npoints = 26
-        slope = numpy.linspace(0, 1, npoints)
-        sign = -1+2*(numpy.arange(npoints)%2)
-        
-        ys = sign * numpy.exp(slope*4)
-        # Make symmetrical
-        ys = numpy.concatenate((ys, ys[-2::-1]))
-        # Normalize amplitude and taper the ends
-        ys *= self.amplitude/numpy.abs(ys).max()
-        ys[0] = ys[-1] = 0
-        
-        xs = numpy.linspace(self.begin, self.end, 2*npoints-1)
-        
-        return matplotlib.path.Path(numpy.transpose([xs, ys]))
+    def _get_path(self):
+        return self._build_path(26)
+    
+    def get_display_path(self, width):
+        points = display_points(width/2, 26)
+        return self.get_path() if points == 26 else self._build_path(points)
+    
+    def _build_path(self, points):
+        xs, ys = template(points)
+        return matplotlib.path.Path(numpy.transpose([
+            self.begin+xs*self.duration, self.amplitude*ys]))
+    
+    def _waveform(self):
+        return template(26)
     
     @property
     def _fields(self):
         return {x: getattr(self, x) for x in ["duration", "amplitude", "begin"]}
+
+@functools.lru_cache(maxsize=32)
+def template(npoints):
+    """ Return the normalized time (between 0 and 1) and unit-amplitude
+        waveform of an echo, shared by all echoes with the same number of
+        points on each side.
+    """
+    
+    slope = numpy.linspace(0, 1, npoints)
+    sign = -1+2*(numpy.arange(npoints)%2)
+    
+    ys = sign * numpy.exp(slope*4)
+    # Make symmetrical
+    ys = numpy.concatenate((ys, ys[-2::-1]))
+    # Normalize amplitude and taper the ends
+    ys /= numpy.abs(ys).max()
+    ys[0] = ys[-1] = 0
+    
+    xs = numpy.linspace(0, 1, 2*npoints-1)
+    
+    # The arrays are shared: prevent accidental modifications
+    xs.setflags(write=False)
+    ys.setflags(write=False)
+    
+    return xs, ys
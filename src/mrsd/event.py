@@ -1,7 +1,33 @@
+import functools
+
+import matplotlib.artist
 import matplotlib.patches
+import matplotlib.path
 import matplotlib.transforms
 import numpy
 
+from .sequence import resolve_begin
+
+class GeometryAttribute(object):
+    """ Attribute defining the path of an event: setting it discards the cached
+        path of the event and updates the table of its diagram.
+    """
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+    
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+        instance._geometry_changed()
+
 class Event(matplotlib.patches.Patch):
     """ Abstract sequence event
         
@@ -9,25 +35,50 @@ class Event(matplotlib.patches.Patch):
         :param amplitude: normalized amplitude between -1 and +1.
         :param begin,end,center: time of the begin, end, or center of the
             event. Only one must be specified.
-        :param offset: horizontal and vertical offset to position the event.
+        :param offset: horizontal and vertical offset to position the event,
+            relative to its channel.
         :param kwargs: passed to matplotlib.patches.Patch
     """
     
+    duration = GeometryAttribute()
+    amplitude = GeometryAttribute()
+    begin = GeometryAttribute()
+    center = GeometryAttribute()
+    end = GeometryAttribute()
+    
+    # Whether the event is a trapezoid defined by its ramps, amplitude and
+    # duration, sampled in closed form
+    _trapezoid = False
+    # Whether the event is a gradient with an arbitrary waveform, integrated
+    # as the polyline of its waveform
+    _sampled = False
+    
+    # Style properties copied to a new event, in order. Properties related to
+    # the placement of the event in a figure (transform, clipping) are set
+    # when the copy is added to a diagram.
+    _style = [
+        x for x in [
+            "agg_filter", "animated", "antialiased", "capstyle", "edgecolor",
+            "edgegapcolor", "facecolor", "fill", "gid", "hatch",
+            "hatch_linewidth", "hatchcolor", "in_layout", "joinstyle", "label",
+            "linestyle", "linewidth", "path_effects", "picker", "rasterized",
+            "sketch_params", "snap", "url", "visible", "zorder", "alpha"]
+        if hasattr(matplotlib.patches.Patch, f"set_{x}")]
+    
     def __init__(
             self, duration, amplitude,
             begin=None, end=None, center=None, offset=None,
             **kwargs):
+        self._path = None
+        # Table of the diagram containing the event
+        self._table = None
+        # Channel of the diagram containing the event, see mrsd.channel
+        self._channel = None
+        
         self.duration = duration
         self.amplitude = amplitude
         
-        if begin is not None:
-            self.begin = begin
-        elif center is not None:
-            self.begin = center - self.duration/2
-        elif end is not None:
-            self.begin = end - self.duration
-        else:
-            raise Exception("Missing time")
+        self.begin = resolve_begin(self.duration, begin, end, center)
         
         self.center = self.begin + self.duration/2
         self.end = self.begin + self.duration
@@ -44,6 +95,68 @@ class Event(matplotlib.patches.Patch):
         
         super().__init__(**kwargs)
     
+    def _geometry_changed(self):
+        """ Discard the cached path and update the table of the diagram.
+        """
+        
+        if self.__dict__.get("_table") is not None:
+            self._table.update(self)
+        if self.__dict__.get("_path") is not None:
+            self._path = None
+            self.stale = True
+    
+    def remove(self):
+        """ Inherited from parent class.
+        """
+        
+        super().remove()
+        if self._table is not None:
+            self._table.remove(self)
+    
+    def get_path(self):
+        """ Return the path of the event, computed only when its geometry has
+            changed since the previous call.
+        """
+        
+        # Instrumented diagram, see mrsd.Diagram.profile
+        if self._table is not None and self._table.stats is not None:
+            return self._table.stats.get_path(self)
+        
+        if self._path is None:
+            self._path = self._get_path()
+        return self._path
+    
+    def _get_path(self):
+        """ Compute the path of the event. Sub-classes define their shape,
+            the default is a box spanning the duration and the amplitude of
+            the event.
+        """
+        
+        return matplotlib.path.Path([
+            [self.begin, 0], [self.begin, self.amplitude],
+            [self.end, self.amplitude], [self.end, 0]])
+    
+    def get_display_path(self, width):
+        """ Return the path of the event, with a level of detail adapted to its
+            width on screen, in pixels. Defaults to the full path.
+        """
+        
+        return self.get_path()
+    
+    def _waveform(self):
+        """ Return the waveform of the event as a polyline, with times
+            normalized between 0 (begin) and 1 (end) and values normalized by
+            the amplitude. Events with the same shape should return the same
+            arrays.
+        """
+        
+        vertices = self.get_path().vertices
+        xs = (vertices[:, 0]-self.begin)/self.duration
+        ys = (
+            vertices[:, 1]/self.amplitude if self.amplitude != 0
+            else numpy.zeros(len(vertices)))
+        return xs, ys
+    
     def move(self, offset):
         """ Move on the time axis, return the object
         """
@@ -55,18 +168,140 @@ class Event(matplotlib.patches.Patch):
     
     def __copy__(self):
         new_object = self.__class__(**self._fields)
-        inspector = matplotlib.artist.ArtistInspector(self)
-        setters = inspector.get_setters()
-        for name, value in inspector.properties().items():
-            if name == "transform" or name not in setters:
-                continue
-            
-            getattr(new_object, f"set_{name}")(value)
+        for name in self._style:
+            getattr(new_object, f"set_{name}")(getattr(self, f"get_{name}")())
+        # Visibility of the event itself, not of its channel
+        new_object.set_visible(matplotlib.patches.Patch.get_visible(self))
+        
+        return new_object
+    
+    def _replicate(self, begin, duration, amplitude, **geometry):
+        """ Return a copy of the event with another geometry, without running
+            the constructors of the event and of matplotlib: the copy shares
+            the style and the other parameters of this event, which must not
+            be part of a figure nor be modified once replicated. This is used
+            to create many events quickly.
+        """
+        
+        # Style of matplotlib.artist.Artist, computed for the first replica
+        style = self.__dict__.get("_replica_style")
+        if style is None:
+            style = self._replica_style = self._artist_style()
+        
+        new_object = object.__new__(type(self))
+        new_object.__dict__.update(self.__dict__)
+        del new_object._replica_style
+        new_object.__dict__.update(
+            geometry, begin=begin, duration=duration, amplitude=amplitude,
+            center=begin+duration/2, end=begin+duration)
+        new_object._path = None
+        new_object.offset = self.offset.copy()
+        
+        # Per-artist state (callbacks, sticky edges, etc.), created as by the
+        # installed version of matplotlib. This also resets the properties
+        # of matplotlib.artist.Artist, which are then copied.
+        matplotlib.artist.Artist.__init__(new_object)
+        for name, value in style:
+            setter = getattr(new_object, f"set_{name}")
+            # The sketch parameters are a tuple of arguments
+            setter(*value) if name == "sketch_params" else setter(value)
         
         return new_object
     
+    def _artist_style(self):
+        """ Return the properties of matplotlib.artist.Artist which differ
+            from their default value, as (name, value) pairs.
+        """
+        
+        style = []
+        for name, default in _artist_defaults:
+            if name == "visible":
+                # Visibility of the event itself, not of its channel
+                value = matplotlib.patches.Patch.get_visible(self)
+            else:
+                value = getattr(self, f"get_{name}")()
+            if value is not default and value != default:
+                style.append((name, value))
+        return style
+    
+    def _assign(self, other):
+        """ Copy the geometry of another event of the same type, return True
+            if the geometry changed. The style of the event is not modified.
+        """
+        
+        geometry = {
+            name: other.__dict__[name] for name in _geometry(type(self))
+            if name in other.__dict__}
+        if all(self.__dict__.get(k) == v for k, v in geometry.items()):
+            return False
+        
+        self.__dict__.update(geometry)
+        self._geometry_changed()
+        self._path = None
+        self.stale = True
+        return True
+    
+    def get_visible(self):
+        """ Inherited from parent class. The events of a hidden channel are
+            not visible.
+        """
+        
+        return (
+            self._visible
+            and (self._channel is None or self._channel.visible))
+    
     def get_patch_transform(self):
-        """ Inherited from parent class.
+        """ Inherited from parent class: the offset of the event, followed by
+            the transform of its channel.
+        """
+        
+        transform = self.get_offset_transform()
+        if self._channel is None:
+            return transform
+        elif transform is _identity:
+            # Shared by the events of the channel
+            return self._channel.transform
+        else:
+            return transform + self._channel.transform
+    
+    def get_offset_transform(self):
+        """ Return the transform of the offset of the event, in the
+            coordinates of its channel.
         """
         
+        if not self.offset.any():
+            return _identity
         return matplotlib.transforms.Affine2D().translate(*self.offset)
+
+@functools.lru_cache(maxsize=None)
+def _geometry(type_):
+    """ Return the names of the geometry attributes of an event type.
+    """
+    
+    return [
+        name for class_ in type_.__mro__
+        for name, value in vars(class_).items()
+        if isinstance(value, GeometryAttribute)]
+
+# Properties of matplotlib.artist.Artist copied by Event._replicate, and their
+# default values
+_artist_defaults = [
+    (name, getattr(matplotlib.artist.Artist(), f"get_{name}")())
+    for name in [
+        "agg_filter", "alpha", "animated", "clip_on", "gid", "in_layout",
+        "label", "path_effects", "picker", "rasterized", "sketch_params",
+        "snap", "url", "visible"]]
+
+# Transform of the events without offset
+_identity = matplotlib.transforms.IdentityTransform()
+
+def display_points(width, points, minimum=5):
+    """ Return the number of points needed to draw a curve of the given width
+        (in pixels), at most the given number of points. The result is a power
+        of two plus one, so that reduced curves can share their templates.
+    """
+    
+    needed = max(2*width, minimum)
+    if needed >= points:
+        return points
+    return min(points, 2**int(numpy.ceil(numpy.log2(needed-1)))+1)
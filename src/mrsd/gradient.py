@@ -1,6 +1,6 @@
 import matplotlib.path
 
-from .event import Event
+from .event import Event, GeometryAttribute
 
 class Gradient(Event):
     """ Gradient event, represented by a trapezoid.
@@ -12,6 +12,11 @@ class Gradient(Event):
             `ramp_down` for asymmetric gradients
     """
     
+    flat_top = GeometryAttribute()
+    ramp_up = GeometryAttribute()
+    ramp_down = GeometryAttribute()
+    _trapezoid = True
+    
     def __init__(self, flat_top, amplitude, ramp=0, **kwargs):
         kwargs.setdefault("ramp_up", ramp)
         kwargs.setdefault("ramp_down", ramp)
@@ -30,8 +35,7 @@ class Gradient(Event):
             gradient.
         """
         
-        area = self.amplitude * (self.ramp_up/2 + self.flat_top + self.ramp_down/2)
-        target_area = area * area_factor
+        target_area = self._area() * area_factor
         
         if ramp_up is None:
             ramp_up = ramp
@@ -42,7 +46,11 @@ class Gradient(Event):
         return Gradient(
             flat_top, amplitude, ramp_up=ramp_up, ramp_down=ramp_down, **kwargs)
     
-    def get_path(self):
+    def _area(self):
+        return self.amplitude * (
+            self.ramp_up/2 + self.flat_top + self.ramp_down/2)
+    
+    def _get_path(self):
         return matplotlib.path.Path([
             [self.begin, 0],
             [self.begin+self.ramp_up, self.amplitude],
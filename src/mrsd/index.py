@@ -0,0 +1,162 @@
+import bisect
+
+import numpy
+
+def spans(first, last):
+    """ Expand index ranges: return the indices i with first[j] <= i < last[j]
+        for each range j, and the range j of each index. Empty and reversed
+        ranges are skipped.
+    """
+    
+    counts = numpy.maximum(numpy.asarray(last)-first, 0)
+    ranges = numpy.repeat(numpy.arange(len(counts)), counts)
+    indices = (
+        numpy.arange(counts.sum())
+        - numpy.repeat(numpy.cumsum(counts)-counts, counts)
+        + numpy.repeat(first, counts))
+    return indices, ranges
+
+class IntervalIndex(object):
+    """ Time index of the events of a channel, sorted by begin time.
+        
+        The (begin, row) keys are stored in sorted blocks of bounded size,
+        each with the maximal end time of its events. A segment tree over these
+        maxima finds the blocks containing the events active in a time window,
+        so that a query costs O(log n + b + k) for k results and blocks of
+        size b, regardless of the duration of the events.
+    """
+    
+    # Blocks are split when they exceed twice this size
+    block_size = 256
+    
+    def __init__(self):
+        # Sorted blocks of (begin, row) keys, end times of their events, and
+        # first key of each block
+        self._blocks = []
+        self._ends = []
+        self._firsts = []
+        # Segment tree of the maximal end time of the blocks: the leaves are
+        # stored from self._leaves
+        self._tree = []
+        self._leaves = 0
+        self._length = 0
+    
+    def __len__(self):
+        return self._length
+    
+    def insert(self, row, begin, end):
+        """ Add the interval of an event.
+        """
+        
+        key = (begin, row)
+        self._length += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._ends.append([end])
+            self._firsts.append(key)
+            self._build()
+            return
+        
+        index = max(bisect.bisect_right(self._firsts, key)-1, 0)
+        block, ends = self._blocks[index], self._ends[index]
+        position = bisect.bisect_left(block, key)
+        block.insert(position, key)
+        ends.insert(position, end)
+        self._firsts[index] = block[0]
+        
+        if len(block) > 2*self.block_size:
+            half = len(block)//2
+            self._blocks[index+1:index+1] = [block[half:]]
+            self._ends[index+1:index+1] = [ends[half:]]
+            self._firsts.insert(index+1, block[half])
+            del block[half:], ends[half:]
+            self._build()
+        elif end > self._tree[self._leaves+index]:
+            self._set(index, end)
+    
+    def remove(self, row, begin):
+        """ Remove the interval of an event.
+        """
+        
+        key = (begin, row)
+        index = bisect.bisect_right(self._firsts, key)-1
+        block, ends = self._blocks[index], self._ends[index]
+        position = bisect.bisect_left(block, key)
+        del block[position], ends[position]
+        self._length -= 1
+        
+        if block:
+            self._firsts[index] = block[0]
+            # The maximal end time may decrease
+            self._set(index, max(ends))
+        else:
+            del self._blocks[index], self._ends[index], self._firsts[index]
+            self._build()
+    
+    def rows(self):
+        """ Return the rows of all events, sorted by begin time.
+        """
+        
+        return [x[1] for block in self._blocks for x in block]
+    
+    def window(self, begin, end):
+        """ Return the rows of the events intersecting a time window (i.e.
+            which begin before its end and end after its begin), sorted by
+            begin time.
+        """
+        
+        last = bisect.bisect_right(self._firsts, (end, float("inf")))-1
+        
+        rows = []
+        for index in self._search(begin, last):
+            block, ends = self._blocks[index], self._ends[index]
+            for (start, row), stop in zip(block, ends):
+                if start > end:
+                    break
+                if stop >= begin:
+                    rows.append(row)
+        return rows
+    
+    def _search(self, begin, last):
+        """ Return the indices, up to last, of the blocks whose maximal end
+            time is at least begin, in increasing order.
+        """
+        
+        indices = []
+        # Nodes of the tree and the first block they cover
+        stack = [(1, 0, self._leaves)] if last >= 0 else []
+        while stack:
+            node, first, size = stack.pop()
+            if first > last or self._tree[node] < begin:
+                continue
+            if node >= self._leaves:
+                indices.append(first)
+            else:
+                size //= 2
+                stack.append((2*node+1, first+size, size))
+                stack.append((2*node, first, size))
+        return indices
+    
+    def _set(self, index, value):
+        """ Update the maximal end time of a block.
+        """
+        
+        node = self._leaves+index
+        self._tree[node] = value
+        node //= 2
+        while node:
+            self._tree[node] = max(self._tree[2*node], self._tree[2*node+1])
+            node //= 2
+    
+    def _build(self):
+        """ Build the segment tree after a change of the blocks.
+        """
+        
+        self._leaves = 1
+        while self._leaves < len(self._blocks):
+            self._leaves *= 2
+        self._tree = [-float("inf")]*(2*self._leaves)
+        for index, ends in enumerate(self._ends):
+            self._tree[self._leaves+index] = max(ends)
+        for node in range(self._leaves-1, 0, -1):
+            self._tree[node] = max(self._tree[2*node], self._tree[2*node+1])
@@ -0,0 +1,111 @@
+import numpy
+
+from .index import spans
+
+def segments(table, channel, kind=None):
+    """ Return the linear segments of the gradients of a channel, as arrays
+        of begin time, end time, begin amplitude and end amplitude.
+        Multi-gradients are represented by their trapezoid of maximal
+        amplitude, sampled gradients by the polyline of their waveform.
+    """
+    
+    rows = table.select(channel, kind)
+    kinds = table.kind[rows]
+    trapezoid = numpy.array([x._trapezoid for x in table.kinds], bool)[kinds]
+    sampled = numpy.array([x._sampled for x in table.kinds], bool)[kinds]
+    
+    trapezoids = rows[trapezoid]
+    begin, end = table.begin[trapezoids], table.end[trapezoids]
+    amplitude = table.amplitude[trapezoids]
+    times = numpy.transpose([
+        begin, begin+table.ramp_up[trapezoids],
+        end-table.ramp_down[trapezoids], end])
+    zero = numpy.zeros(len(trapezoids))
+    polylines = [(times, numpy.transpose([zero, amplitude, amplitude, zero]))]
+    
+    # Sampled gradients, grouped by waveform
+    groups = {}
+    for row in rows[sampled]:
+        xs, ys = table.events[row]._waveform()
+        groups.setdefault(id(ys), (xs, ys, []))[2].append(row)
+    for xs, ys, group in groups.values():
+        begin = table.begin[group]
+        polylines.append((
+            begin[:, None] + numpy.outer(table.end[group]-begin, xs),
+            numpy.outer(table.amplitude[group], ys)))
+    
+    return tuple(
+        numpy.concatenate([x[:, slice_].ravel() for x in arrays])
+        for arrays in zip(*polylines)
+        for slice_ in [slice(None, -1), slice(1, None)])
+
+def moment(table, channel, times, order=0, kind=None):
+    """ Return the cumulative moment of the gradients of a channel, i.e. the
+        integral of G(t) t^order from the beginning of the sequence, at the
+        given times.
+        
+        The moment is computed in closed form: the complete segments of the
+        trapezoids are summed by a cumulative sum, and the segments in progress
+        are integrated up to each time.
+        
+        :param table: :class:`mrsd.table.EventTable` of the events
+        :param channel: name of the channel
+        :param times: evaluation times, in any order
+        :param order: order of the moment, 0 or 1
+        :param kind: if specified, only integrate the events of this type
+            (including sub-classes)
+    """
+    
+    if order not in [0, 1]:
+        raise Exception(f"Unsupported moment order: {order}")
+    
+    t0, t1, g0, g1 = segments(table, channel, kind)
+    duration = t1 - t0
+    slope = numpy.divide(
+        g1-g0, duration, out=numpy.zeros(len(t0)), where=duration>0)
+    
+    times = numpy.asarray(times, float)
+    shape = times.shape
+    times = times.ravel()
+    order_ = numpy.argsort(times, kind="stable")
+    sorted_times = times[order_]
+    
+    # Complete segments
+    by_end = numpy.argsort(t1, kind="stable")
+    complete = numpy.concatenate(
+        [[0], numpy.cumsum(_integral(order, t1, t0, g0, slope)[by_end])])
+    result = complete[numpy.searchsorted(t1[by_end], sorted_times, "right")]
+    
+    # Segments in progress
+    indices, segments_ = spans(
+        numpy.searchsorted(sorted_times, t0, "right"),
+        numpy.searchsorted(sorted_times, t1, "left"))
+    result += numpy.bincount(
+        indices,
+        _integral(
+            order, sorted_times[indices],
+            t0[segments_], g0[segments_], slope[segments_]),
+        len(times))
+    
+    moments = numpy.empty(len(times))
+    moments[order_] = result
+    return moments.reshape(shape)
+
+def kspace(table, channels, times, gamma=1, kind=None):
+    """ Return the k-space trajectory, i.e. the zeroth moment of each of the
+        given gradient channels scaled by the gyromagnetic ratio, as an array
+        of shape (len(times), len(channels)).
+    """
+    
+    return gamma * numpy.transpose([
+        moment(table, channel, times, 0, kind) for channel in channels])
+
+def _integral(order, t, t0, g0, slope):
+    """ Integral of (g0 + slope (τ-t0)) τ^order for τ from t0 to t.
+    """
+    
+    u = t - t0
+    if order == 0:
+        return g0*u + slope*u**2/2
+    else:
+        return (g0*t0 + (g0+slope*t0)*u/2 + slope*u**2/3)*u
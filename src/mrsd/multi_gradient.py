@@ -1,7 +1,7 @@
 import matplotlib.path
 import numpy
 
-from .event import Event
+from .event import Event, GeometryAttribute
 
 class MultiGradient(Event):
     """ Multiple gradient events (e.g. phase encoding), represented by nested
@@ -16,6 +16,12 @@ class MultiGradient(Event):
             amplitude
     """
     
+    flat_top = GeometryAttribute()
+    ramp_up = GeometryAttribute()
+    ramp_down = GeometryAttribute()
+    steps = GeometryAttribute()
+    _trapezoid = True
+    
     def __init__(self, flat_top, amplitude, ramp=0, steps=5, **kwargs):
         
         kwargs.setdefault("ramp_up", ramp)
@@ -30,7 +36,7 @@ class MultiGradient(Event):
         super().__init__(
             self.ramp_up+self.flat_top+self.ramp_down, amplitude, **kwargs)
         
-    def get_path(self):
+    def _get_path(self):
         amplitudes = numpy.linspace(-self.amplitude, self.amplitude, self.steps)
         
         paths = [
@@ -0,0 +1,212 @@
+import concurrent.futures
+import itertools
+import math
+
+import numpy
+
+from . import storage
+
+def sweep(
+        builder, grid, channels, figure=None, columns=None, collections=False,
+        jobs=None):
+    """ Draw a sequence for each point of a parameter grid, as small multiples
+        sharing their axes.
+        
+        The builder is called once, with a diagram whose parameters (see
+        :meth:`mrsd.Diagram.set_params`) are those of a point of the grid: the
+        events depending on the parameters must be created by
+        :meth:`mrsd.Diagram.template`. For the other points, only the
+        templates depending on the modified parameters are run again, and the
+        panel is built from the events of the first diagram: events with the
+        same type, style and parameters are replicated from a shared
+        prototype, and their paths are shared.
+        
+        :param builder: function adding the events to a diagram
+        :param grid: sequence of parameters (dictionaries), or dictionary of
+            parameter names to values, the panels being all combinations of
+            the values
+        :param channels: channels of the diagrams
+        :param figure: figure of the panels, created with pyplot if None
+        :param columns: number of columns, default to the number of values of
+            the last parameter if the grid is a dictionary, to a square layout
+            otherwise
+        :param collections: if True, draw the events in collections
+        :param jobs: if specified, build and render the panels as images in
+            this number of processes, in which case the builder must be
+            picklable (e.g. a module-level function)
+        :return: the diagram of each panel, in the order of the grid, or its
+            image (matplotlib.image.AxesImage) if jobs is specified
+    """
+    
+    if isinstance(grid, dict):
+        names = list(grid)
+        points = [
+            dict(zip(names, values))
+            for values in itertools.product(*grid.values())]
+        if columns is None:
+            columns = len(grid[names[-1]])
+    else:
+        points = list(grid)
+    if not points:
+        raise Exception("Empty grid")
+    if columns is None:
+        columns = math.ceil(math.sqrt(len(points)))
+    rows = math.ceil(len(points)/columns)
+    
+    if figure is None:
+        import matplotlib.pyplot
+        figure = matplotlib.pyplot.figure(
+            figsize=(2.5*columns, 2*rows), tight_layout=True)
+    
+    if jobs is None:
+        plots = figure.subplots(
+            rows, columns, sharex=True, sharey=True, squeeze=False).ravel()
+        for plot in plots[len(points):]:
+            plot.set_visible(False)
+        plots = plots[:len(points)]
+        for plot, point in zip(plots, points):
+            plot.set_title(_title(point), fontsize="small")
+        return _panels(builder, points, channels, plots, collections)
+    else:
+        plots = figure.subplots(rows, columns, squeeze=False).ravel()
+        for plot in plots:
+            plot.set_axis_off()
+        
+        # Contiguous chunks, so that each process updates its first diagram
+        # incrementally
+        size = math.ceil(len(points)/jobs)
+        chunks = [points[i:i+size] for i in range(0, len(points), size)]
+        panel_size = (
+            figure.get_figwidth()/columns, figure.get_figheight()/rows)
+        # The panels are comparable, as with shared axes
+        limits = _limits(builder, points, channels, collections)
+        with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+            images = executor.map(
+                _render, itertools.repeat(builder), chunks,
+                itertools.repeat(channels), itertools.repeat(collections),
+                itertools.repeat(panel_size), itertools.repeat(figure.dpi),
+                itertools.repeat(limits))
+            images = list(itertools.chain.from_iterable(images))
+        
+        return [plot.imshow(image) for plot, image in zip(plots, images)]
+
+def _panels(builder, points, channels, plots, collections):
+    """ Build the diagram of each point on its axes.
+    """
+    
+    from .diagram import Diagram
+    
+    # The first diagram is built last, so that it ends with its own
+    # parameters
+    base = Diagram(plots[-1], channels, collections)
+    base.set_params(**points[-1])
+    builder(base)
+    
+    # Descriptions of the events of the first diagram, updated when they are
+    # modified, and caches shared by the panels
+    descriptions = {}
+    prototypes, envelopes = {}, {}
+    
+    diagrams = []
+    for plot, point in zip(plots[:-1], points[:-1]):
+        for event in base.set_params(**point):
+            descriptions.pop(id(event), None)
+        diagrams.append(
+            _clone(base, plot, descriptions, prototypes, envelopes))
+    base.set_params(**points[-1])
+    diagrams.append(base)
+    
+    return diagrams
+
+def _clone(diagram, plot, descriptions, prototypes, envelopes):
+    """ Return a copy of a diagram on other axes. The descriptions of the
+        events are cached by event, the prototypes and envelopes are shared
+        with other copies.
+    """
+    
+    from .diagram import Diagram
+    
+    diagram._flush()
+    table = diagram.table
+    rows = numpy.flatnonzero(table.alive)
+    
+    events, paths = [], []
+    for channel, event in zip(table.channel[rows], table.get(rows)):
+        cached = descriptions.get(id(event))
+        # Since removed events may be garbage-collected, check the identity
+        if cached is None or cached[0] is not event:
+            description = storage._describe(table.channels[channel], event)
+            description["group"] = storage._group(description)
+            cached = [event, description, event.get_path()]
+            descriptions[id(event)] = cached
+        events.append(cached[1])
+        paths.append(cached[2])
+    
+    clone = Diagram(plot, list(diagram._channels), diagram._use_collections)
+    storage._build(
+        clone, storage._metadata(diagram), events, prototypes, envelopes,
+        paths)
+    return clone
+
+def _limits(builder, points, channels, collections):
+    """ Return the x- and y-limits shared by the panels of all points, as
+        with shared axes: the union of the data limits of the panels is
+        autoscaled, except on an axis with explicit limits, where the union of
+        these limits is used.
+    """
+    
+    import matplotlib.figure
+    import matplotlib.transforms
+    
+    from .diagram import Diagram
+    
+    plot = matplotlib.figure.Figure().add_subplot()
+    diagram = Diagram(plot, channels, collections)
+    diagram.set_params(**points[0])
+    builder(diagram)
+    
+    data, explicit = [], []
+    for point in points:
+        diagram.set_params(**point)
+        data.append(plot.dataLim.frozen())
+        explicit.append([plot.get_xlim(), plot.get_ylim()])
+    
+    plot.dataLim.set(matplotlib.transforms.Bbox.union(data))
+    plot.autoscale_view()
+    explicit = numpy.array(explicit)
+    return [
+        limits if automatic
+            else (explicit[:, axis].min(), explicit[:, axis].max())
+        for axis, (limits, automatic) in enumerate([
+            (plot.get_xlim(), plot.get_autoscalex_on()),
+            (plot.get_ylim(), plot.get_autoscaley_on())])]
+
+def _render(builder, points, channels, collections, size, dpi, limits):
+    """ Build and render panels in a worker process, return their images as
+        RGBA arrays. The x- and y-limits of all panels are set to the given
+        limits.
+    """
+    
+    import matplotlib.backends.backend_agg
+    import matplotlib.figure
+    
+    figures = [
+        matplotlib.figure.Figure(figsize=size, dpi=dpi, tight_layout=True)
+        for _ in points]
+    plots = []
+    for figure, point in zip(figures, points):
+        matplotlib.backends.backend_agg.FigureCanvasAgg(figure)
+        plots.append(figure.add_subplot())
+        plots[-1].set_title(_title(point), fontsize="small")
+    _panels(builder, points, channels, plots, collections)
+    for plot in plots:
+        plot.set(xlim=limits[0], ylim=limits[1])
+    
+    images = []
+    for figure in figures:
+        figure.canvas.draw()
+        images.append(numpy.asarray(figure.canvas.buffer_rgba()).copy())
+    return images
+
+def _title(point):
+    return ", ".join(f"{name}={value}" for name, value in point.items())
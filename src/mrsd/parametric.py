@@ -0,0 +1,313 @@
+import abc
+import operator
+
+from .event import Event
+
+class Expression(abc.ABC):
+    """ Value computed from named parameters and from attributes of events
+        created by templates (see :meth:`mrsd.Diagram.template`). Expressions
+        are combined with the arithmetic operators, e.g. ``p.TE - p.d_ramp``.
+    """
+    
+    @abc.abstractmethod
+    def evaluate(self, values):
+        """ Return the value of the expression for the given parameters.
+        """
+    
+    @abc.abstractmethod
+    def dependencies(self):
+        """ Return the names of the parameters and the template nodes used by
+            the expression.
+        """
+    
+    def __add__(self, other):
+        return Operation(operator.add, self, other)
+    
+    def __radd__(self, other):
+        return Operation(operator.add, other, self)
+    
+    def __sub__(self, other):
+        return Operation(operator.sub, self, other)
+    
+    def __rsub__(self, other):
+        return Operation(operator.sub, other, self)
+    
+    def __mul__(self, other):
+        return Operation(operator.mul, self, other)
+    
+    def __rmul__(self, other):
+        return Operation(operator.mul, other, self)
+    
+    def __truediv__(self, other):
+        return Operation(operator.truediv, self, other)
+    
+    def __rtruediv__(self, other):
+        return Operation(operator.truediv, other, self)
+    
+    def __neg__(self):
+        return Operation(operator.neg, self)
+
+class Parameter(Expression):
+    """ Named parameter of a diagram, e.g. the echo time.
+    """
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def evaluate(self, values):
+        try:
+            return values[self.name]
+        except KeyError:
+            raise Exception(f"Unknown parameter: {self.name}")
+    
+    def dependencies(self):
+        return {self.name}, set()
+    
+    def __repr__(self):
+        return f"Parameter({self.name!r})"
+
+class Attribute(Expression):
+    """ Attribute of an event created by a template, e.g. the end of an
+        excitation pulse.
+    """
+    
+    def __init__(self, handle, name):
+        self.handle = handle
+        self.name = name
+    
+    def evaluate(self, values):
+        return getattr(self.handle.event, self.name)
+    
+    def dependencies(self):
+        return set(), {self.handle.node}
+    
+    def __repr__(self):
+        return f"Attribute({self.handle!r}, {self.name!r})"
+
+class Operation(Expression):
+    """ Function of expressions and constants.
+    """
+    
+    def __init__(self, function, *operands):
+        self.function = function
+        self.operands = operands
+    
+    def evaluate(self, values):
+        return self.function(*resolve(self.operands, values))
+    
+    def dependencies(self):
+        return dependencies(self.operands)
+
+class Handle(object):
+    """ Reference to an event created by a template. Its attributes are
+        expressions (e.g. ``readout.begin``), which are updated when the event
+        is recomputed. The event itself is :attr:`event`.
+    """
+    
+    def __init__(self, node, index):
+        self.node = node
+        self.index = index
+    
+    @property
+    def event(self):
+        """ Current event of the handle.
+        """
+        
+        return self.node.events[self.index]
+    
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return Attribute(self, name)
+    
+    def __repr__(self):
+        return f"Handle({self.event!r})"
+
+class Parameters(object):
+    """ Named parameters of a diagram, as expressions: ``diagram.params.TE``.
+    """
+    
+    def __init__(self, values):
+        self._values = values
+    
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in self._values:
+            raise AttributeError(name)
+        return Parameter(name)
+    
+    def __dir__(self):
+        return sorted(self._values)
+
+class Node(object):
+    """ Call of a function creating events, whose arguments may contain
+        expressions and handles. The node is run again when one of its
+        dependencies changes.
+    """
+    
+    def __init__(self, function, args, kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.parameters, self.nodes = dependencies([args, kwargs])
+        
+        # Events created by the function, and their channel, type and
+        # drawing mode
+        self.events = []
+        self.placement = []
+        # Events, other artists and saved annotations created by the last run
+        self.pending = []
+        self.artists = []
+        self.records = []
+
+class Template(object):
+    """ Parameters of a diagram and dependency graph of the calls which
+        created its events. When parameters change, only the nodes which
+        depend on them, directly or through the events of other nodes, are
+        run again. Their events are then updated in place.
+        
+        :param diagram: :class:`mrsd.Diagram` containing the events
+    """
+    
+    def __init__(self, diagram):
+        self.diagram = diagram
+        self.values = {}
+        self.params = Parameters(self.values)
+        # Nodes, in order of creation, which is also an order of dependency
+        self.nodes = []
+    
+    def add(self, function, args, kwargs):
+        """ Create a node, add its events to the diagram and return the
+            result of the function, where events are replaced by handles.
+        """
+        
+        node = Node(function, args, kwargs)
+        result = self._run(node)
+        
+        with self.diagram.batch():
+            for channel, event, collect in node.pending:
+                self.diagram._add(channel, event, collect)
+        node.events = [x[1] for x in node.pending]
+        node.placement = [(x[0], type(x[1]), x[2]) for x in node.pending]
+        self.nodes.append(node)
+        
+        indices = {id(event): index for index, event in enumerate(node.events)}
+        def wrap(value):
+            if isinstance(value, Event) and id(value) in indices:
+                return Handle(node, indices[id(value)])
+            elif isinstance(value, (list, tuple)):
+                return type(value)(wrap(x) for x in value)
+            else:
+                return value
+        return wrap(result)
+    
+    def set(self, values):
+        """ Update the parameters, run the nodes depending on the modified
+            parameters and return the modified events.
+        """
+        
+        modified = {
+            name for name, value in values.items()
+            if name not in self.values or self.values[name] != value}
+        self.values.update(values)
+        if not modified:
+            return []
+        
+        self.diagram._flush()
+        
+        updated_nodes = set()
+        events = []
+        # Channels of the modified, added and removed events
+        channels = set()
+        for node in self.nodes:
+            if node.parameters & modified or node.nodes & updated_nodes:
+                channels.update(x[0] for x in node.placement)
+                updated = self._update(node)
+                if updated:
+                    updated_nodes.add(node)
+                    events.extend(updated)
+                    channels.update(x[0] for x in node.placement)
+        
+        # The extents and the limits may also shrink
+        self.diagram._update_extents(channels)
+        self.diagram._update_limits()
+        
+        return events
+    
+    def _run(self, node):
+        """ Call the function of a node, capturing the events it creates.
+        """
+        
+        node.pending = []
+        node.artists = []
+        node.records = []
+        
+        self.diagram._capture = node
+        try:
+            return node.function(
+                *resolve(node.args, self.values),
+                **resolve(node.kwargs, self.values))
+        finally:
+            self.diagram._capture = None
+    
+    def _update(self, node):
+        """ Run a node again, return its modified events.
+        """
+        
+        for artist in node.artists:
+            artist.remove()
+        for records, record in node.records:
+            records.remove(record)
+        
+        self._run(node)
+        
+        placement = [(x[0], type(x[1]), x[2]) for x in node.pending]
+        if placement == node.placement:
+            # Same events: update their geometry
+            return [
+                old for old, (_, new, _) in zip(node.events, node.pending)
+                if old._assign(new)]
+        else:
+            # Different events, e.g. another length of a train: replace them
+            for event in node.events:
+                event.remove()
+            with self.diagram.batch():
+                for channel, event, collect in node.pending:
+                    self.diagram._add(channel, event, collect)
+            node.events = [x[1] for x in node.pending]
+            node.placement = placement
+            return list(node.events)
+
+def resolve(value, values):
+    """ Replace expressions by their value and handles by their event, in
+        nested lists, tuples and dictionaries.
+    """
+    
+    if isinstance(value, Expression):
+        return value.evaluate(values)
+    elif isinstance(value, Handle):
+        return value.event
+    elif isinstance(value, (list, tuple)):
+        return type(value)(resolve(x, values) for x in value)
+    elif isinstance(value, dict):
+        return {k: resolve(v, values) for k, v in value.items()}
+    else:
+        return value
+
+def dependencies(value):
+    """ Return the names of the parameters and the nodes used by the
+        expressions and the handles in nested lists, tuples and dictionaries.
+    """
+    
+    if isinstance(value, Expression):
+        return value.dependencies()
+    elif isinstance(value, Handle):
+        return set(), {value.node}
+    elif isinstance(value, (list, tuple, dict)):
+        parameters, nodes = set(), set()
+        for item in (value.values() if isinstance(value, dict) else value):
+            item_parameters, item_nodes = dependencies(item)
+            parameters |= item_parameters
+            nodes |= item_nodes
+        return parameters, nodes
+    else:
+        return set(), set()
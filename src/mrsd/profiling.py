@@ -0,0 +1,69 @@
+import functools
+import time
+
+class Stats(object):
+    """ Number of calls and cumulative duration (in seconds) of the phases of
+        a diagram, e.g. "add", "flush", "autoscale", "draw" or "path.<type>"
+        (computation of the path of an event type). Phases may be nested:
+        e.g. "add" includes "autoscale".
+        
+        Hooks are called after each measurement with the name of the phase
+        and its duration, e.g. to feed an external telemetry system.
+    """
+    
+    def __init__(self):
+        self.calls = {}
+        self.times = {}
+        self.hooks = []
+    
+    def record(self, name, duration):
+        """ Record a call of a phase.
+        """
+        
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0) + duration
+        for hook in self.hooks:
+            hook(name, duration)
+    
+    def wrap(self, name, function):
+        """ Return a function recording the calls of the given function.
+        """
+        
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            begin = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter()-begin)
+        return wrapper
+    
+    def get_path(self, event):
+        """ Return the path of an event, recording the calls and the path
+            computations.
+        """
+        
+        self.calls["get_path"] = self.calls.get("get_path", 0) + 1
+        if event._path is None:
+            begin = time.perf_counter()
+            event._path = event._get_path()
+            self.record(
+                f"path.{type(event).__name__}", time.perf_counter()-begin)
+        return event._path
+    
+    def reset(self):
+        """ Discard the recorded calls and durations.
+        """
+        
+        self.calls.clear()
+        self.times.clear()
+    
+    def as_dict(self):
+        """ Return the phases as a dictionary of name to number of calls and
+            duration, the longest first.
+        """
+        
+        return {
+            name: {"calls": self.calls[name], "time": self.times.get(name, 0)}
+            for name in sorted(
+                self.calls, key=lambda x: -self.times.get(x, 0))}
@@ -0,0 +1,292 @@
+import numpy
+
+from . import rf_pulse
+from .sequence import Sequence
+
+# Default diagram channels of the Pulseq channels
+default_channels = {
+    "rf": "RF", "gx": "Gx", "gy": "Gy", "gz": "Gz", "adc": "ADC"}
+
+# Default raster times, in seconds
+_rasters = {
+    "BlockDurationRaster": 1e-5, "GradientRasterTime": 1e-5,
+    "RadiofrequencyRasterTime": 1e-6}
+
+def read(
+        path, blocks=None, begin=None, end=None, channels=None, unit=1e-3,
+        tolerance=1e-3):
+    """ Read the events of a Pulseq sequence (version 1.4 or later) in a
+        :class:`mrsd.Sequence`. The file is read once, line by line, and only
+        the blocks of the selected window, the events and the shapes they use
+        are kept in memory.
+        
+        RF pulses are drawn with their sampled envelope (magnitude and phase),
+        trapezoids as gradients, arbitrary gradients and extended trapezoids
+        as sampled gradients (see :class:`mrsd.SampledGradient`). The
+        amplitudes are normalized by the maximal amplitude of each channel in
+        the window.
+        
+        :param path: path to the .seq file
+        :param blocks: first and last selected block numbers (inclusive), or
+            None for all blocks
+        :param begin,end: selected time window, in the time unit: only the
+            blocks intersecting the window are read
+        :param channels: diagram channels of the Pulseq channels ("rf", "gx",
+            "gy", "gz", "adc"), a channel mapped to None is skipped. Defaults
+            to :data:`mrsd.pulseq.default_channels`.
+        :param unit: time unit of the events, in seconds (defaults to ms)
+        :param tolerance: tolerance of the simplification of the envelopes
+            (see :func:`mrsd.array_envelope`)
+    """
+    
+    channels = {**default_channels, **(channels or {})}
+    
+    with open(path) as fd:
+        data = _parse(_lines(fd), blocks, begin, end, unit)
+    
+    sequence = Sequence([x for x in channels.values() if x is not None])
+    shapes = data["shapes"]
+    envelopes = {}
+    for start, rf, gradients, adc in data["blocks"]:
+        if rf and channels["rf"] is not None:
+            _rf_pulse(
+                sequence, channels["rf"], start, data["rf"][rf], shapes,
+                data["definitions"], envelopes, unit, tolerance)
+        for name, gradient in zip(["gx", "gy", "gz"], gradients):
+            if gradient and channels[name] is not None:
+                _gradient(
+                    sequence, channels[name], start, gradient, data, shapes,
+                    envelopes, unit, tolerance)
+        if adc and channels["adc"] is not None:
+            number, dwell, delay = data["adc"][adc]
+            sequence.adc(
+                channels["adc"], number*dwell*1e-9/unit,
+                begin=start+delay*1e-6/unit)
+    
+    # Amplitudes relative to the maximal amplitude of each channel
+    for channel in sequence.channels:
+        records = sequence.events(channel)
+        peak = max((abs(x.amplitude) for x in records), default=0)
+        for record in records:
+            record.amplitude = record.amplitude/peak if peak > 0 else 0
+    
+    return sequence
+
+def load(plot, path, collections=False, **kwargs):
+    """ Load a Pulseq sequence in a new :class:`mrsd.Diagram`.
+        
+        :param plot: an instance of matplotlib axes (plot, subplot, etc.)
+        :param path: path to the .seq file
+        :param collections: passed to :class:`mrsd.Diagram`
+        :param kwargs: passed to :func:`read`
+    """
+    
+    from .diagram import Diagram
+    
+    sequence = read(path, **kwargs)
+    diagram = Diagram(plot, sequence.channels, collections)
+    diagram.render(sequence)
+    return diagram
+
+def decompress(values, count):
+    """ Return the samples of a Pulseq shape: the run-length encoded
+        derivative of the samples, or the samples themselves if they are not
+        compressed.
+    """
+    
+    if len(values) == count:
+        return numpy.array(values, float)
+    
+    derivative = []
+    index = 0
+    while index < len(values):
+        # Two equal values followed by the number of further repetitions
+        if index+2 < len(values) and values[index] == values[index+1]:
+            derivative.extend([values[index]]*(2+int(values[index+2])))
+            index += 3
+        else:
+            derivative.append(values[index])
+            index += 1
+    
+    if len(derivative) != count:
+        raise Exception(
+            f"Invalid shape: {len(derivative)} samples instead of {count}")
+    return numpy.cumsum(derivative)
+
+def _lines(fd):
+    """ Return the non-empty lines of a file, without comments.
+    """
+    
+    for line in fd:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            yield line
+
+def _parse(lines, blocks, begin, end, unit):
+    """ Read the selected blocks, and the events and shapes they use.
+    """
+    
+    data = {
+        "definitions": dict(_rasters), "version": (0, 0), "blocks": [],
+        "rf": {}, "gradients": {}, "trap": {}, "adc": {}, "shapes": {}}
+    # Events and shapes used by the selected blocks
+    used = {"rf": set(), "gradients": set(), "adc": set(), "shapes": set()}
+    
+    section = None
+    # Begin time of the current block, in seconds
+    time = 0
+    # Current shape: identifier, number of samples, values (None if unused)
+    shape = None
+    
+    for line in lines:
+        if line.startswith("["):
+            section = line.strip("[]").upper()
+            if section == "BLOCKS" and data["version"] < (1, 4):
+                raise Exception(
+                    "Unsupported Pulseq version: "
+                    + ".".join(str(x) for x in data["version"]))
+            continue
+        fields = line.split()
+        
+        if section == "VERSION":
+            if fields[0] in ["major", "minor"]:
+                major, minor = data["version"]
+                data["version"] = (
+                    (int(fields[1]), minor) if fields[0] == "major"
+                    else (major, int(fields[1])))
+        elif section == "DEFINITIONS":
+            try:
+                data["definitions"][fields[0]] = float(fields[1])
+            except (IndexError, ValueError):
+                pass
+        elif section == "BLOCKS":
+            number, duration, *events = [int(x) for x in fields[:8]]
+            duration *= data["definitions"]["BlockDurationRaster"]
+            start, time = time, time+duration
+            
+            if blocks is not None and not blocks[0] <= number <= blocks[1]:
+                continue
+            if begin is not None and time/unit < begin:
+                continue
+            if end is not None and start/unit > end:
+                continue
+            
+            rf, gx, gy, gz, adc = events[:5]
+            data["blocks"].append((start/unit, rf, (gx, gy, gz), adc))
+            used["rf"].add(rf)
+            used["gradients"].update([gx, gy, gz])
+            used["adc"].add(adc)
+        elif section == "RF":
+            identifier = int(fields[0])
+            if identifier not in used["rf"]:
+                continue
+            # Version 1.5 adds the center of the pulse before its delay
+            delay = fields[6 if data["version"] >= (1, 5) else 5]
+            rf = [float(fields[1]), *[int(x) for x in fields[2:5]]]
+            data["rf"][identifier] = (*rf, float(delay))
+            used["shapes"].update(rf[1:])
+        elif section == "GRADIENTS":
+            identifier = int(fields[0])
+            if identifier not in used["gradients"]:
+                continue
+            amplitude, first, last = [float(x) for x in fields[1:4]]
+            amplitude_shape, time_shape = [int(x) for x in fields[4:6]]
+            data["gradients"][identifier] = (
+                amplitude, first, last, amplitude_shape, time_shape,
+                float(fields[6]))
+            used["shapes"].update([amplitude_shape, time_shape])
+        elif section == "TRAP":
+            identifier = int(fields[0])
+            if identifier in used["gradients"]:
+                data["trap"][identifier] = tuple(float(x) for x in fields[1:6])
+        elif section == "ADC":
+            identifier = int(fields[0])
+            if identifier in used["adc"]:
+                data["adc"][identifier] = (
+                    int(fields[1]), float(fields[2]), float(fields[3]))
+        elif section == "SHAPES":
+            if fields[0] == "shape_id":
+                identifier = int(fields[1])
+                shape = [
+                    identifier, None,
+                    [] if identifier in used["shapes"] else None]
+            elif fields[0] == "num_samples":
+                shape[1] = int(fields[1])
+            elif shape[2] is not None:
+                shape[2].append(float(fields[0]))
+                if len(shape[2]) == 1:
+                    data["shapes"][shape[0]] = shape
+    
+    data["shapes"] = {
+        identifier: decompress(values, count)
+        for identifier, count, values in data["shapes"].values()}
+    
+    return data
+
+def _samples(shapes, identifier, count, raster):
+    """ Return the times of the samples of a shape, and its duration.
+    """
+    
+    if identifier == 0:
+        # Default timing: centers of the raster intervals
+        return (0.5+numpy.arange(count))*raster, count*raster
+    times = shapes[identifier]*raster
+    return times, times[-1]
+
+def _envelope(key, times, values, duration, envelopes, tolerance):
+    """ Return the amplitude and the envelope of sampled values. Envelopes
+        are shared by the events using the same shapes.
+    """
+    
+    peak = numpy.abs(values).max()
+    if key not in envelopes:
+        xs = numpy.asarray(times/duration-0.5, float)
+        ys = numpy.asarray(values/peak if peak > 0 else values, float)
+        envelopes[key] = rf_pulse._template_envelope(
+            rf_pulse._simplified(xs, ys, tolerance))
+    return peak, envelopes[key]
+
+def _rf_pulse(
+        sequence, channel, start, rf, shapes, definitions, envelopes, unit,
+        tolerance):
+    amplitude, magnitude, phase, time, delay = rf
+    
+    values = shapes[magnitude]
+    if phase:
+        # Phases are normalized by 2π
+        values = values*numpy.cos(2*numpy.pi*shapes[phase])
+    times, duration = _samples(
+        shapes, time, len(values), definitions["RadiofrequencyRasterTime"])
+    
+    peak, envelope = _envelope(
+        ("rf", magnitude, phase, time), times, values, duration, envelopes,
+        tolerance)
+    sequence.rf_pulse(
+        channel, duration/unit, amplitude*peak, envelope,
+        begin=start+delay*1e-6/unit)
+
+def _gradient(
+        sequence, channel, start, identifier, data, shapes, envelopes, unit,
+        tolerance):
+    if identifier in data["trap"]:
+        amplitude, rise, flat, fall, delay = data["trap"][identifier]
+        sequence.gradient(
+            channel, flat*1e-6/unit, amplitude,
+            ramp_up=rise*1e-6/unit, ramp_down=fall*1e-6/unit,
+            begin=start+delay*1e-6/unit)
+        return
+    
+    amplitude, first, last, shape, time, delay = data["gradients"][identifier]
+    values = amplitude*shapes[shape]
+    times, duration = _samples(
+        shapes, time, len(values), data["definitions"]["GradientRasterTime"])
+    if time == 0:
+        # The first and last values are on the edges of the raster
+        times = numpy.concatenate([[0], times, [duration]])
+        values = numpy.concatenate([[first], values, [last]])
+    
+    peak, envelope = _envelope(
+        ("gradient", identifier), times, values, duration, envelopes,
+        tolerance)
+    sequence.sampled_gradient(
+        channel, duration/unit, peak, envelope, begin=start+delay*1e-6/unit)
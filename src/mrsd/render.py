@@ -0,0 +1,333 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+from .cache import RenderCache
+
+def main(argv=None):
+    """ Entry point of the mrsd-render command.
+    """
+    
+    parser = argparse.ArgumentParser(
+        prog="mrsd-render",
+        description=(
+            "Render sequence diagrams, defined by Python scripts or saved by "
+            "mrsd.Diagram.save, in parallel"))
+    parser.add_argument(
+        "inputs", nargs="+", metavar="input",
+        help="Python script (all its figures are rendered) or saved diagram "
+            "(.json or .npz) or Pulseq sequence (.seq)")
+    parser.add_argument(
+        "--output", "-o", default=".",
+        help="Output directory: the outputs of each input are written in a "
+            "tree which mirrors the directories of the inputs (default: "
+            "current directory)")
+    parser.add_argument(
+        "--format", "-f", action="append", dest="formats",
+        choices=["png", "svg", "pdf"],
+        help="Output format, may be repeated (default: png)")
+    parser.add_argument(
+        "--dpi", type=float, help="Resolution of raster outputs")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count(),
+        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument(
+        "--cache", help="Cache directory: unchanged inputs are not rendered")
+    parser.add_argument(
+        "--cache-size", type=float, default=256,
+        help="Maximal size of the cache, in MiB (default: 256)")
+    parser.add_argument(
+        "--depends", "-d", action="append", dest="dependencies", default=[],
+        metavar="path",
+        help="Other file read by the inputs (e.g. data file): the inputs are "
+            "rendered again when it changes, may be repeated")
+    arguments = parser.parse_args(argv)
+    
+    cache = None
+    if arguments.cache is not None:
+        cache = RenderCache(arguments.cache, int(arguments.cache_size*2**20))
+    
+    try:
+        results = render_all(
+            arguments.inputs, arguments.output, arguments.formats or ["png"],
+            arguments.dpi, arguments.jobs, cache, arguments.dependencies)
+    except Exception as e:
+        parser.error(str(e))
+    
+    failures = [x for x in results if x[3] is not None]
+    print(
+        f"{len(results)-len(failures)} rendered, {len(failures)} failed",
+        file=sys.stderr)
+    return 1 if failures else 0
+
+def render_all(
+        inputs, output, formats, dpi=None, jobs=None, cache=None,
+        dependencies=None, report=True):
+    """ Render several inputs in a pool of processes using the Agg backend. A
+        failing input does not stop the others.
+        
+        :param inputs: paths to Python scripts or saved diagrams
+        :param output: output directory. The outputs of each input are
+            written in the same tree as the inputs, relative to their common
+            directory, e.g. "a/figures.py" and "b/figures.py" are rendered in
+            "<output>/a" and "<output>/b".
+        :param formats: output formats (e.g. "png", "svg", "pdf")
+        :param dpi: resolution of raster outputs, default to the figure
+            resolution
+        :param jobs: number of worker processes, default to the number of CPUs
+        :param cache: :class:`mrsd.cache.RenderCache` or None
+        :param dependencies: paths to other files read by the inputs (e.g.
+            data files), see :func:`render`
+        :param report: if True, print the outcome of each input when it is
+            done
+        :return: list of (input, outputs, duration, error, cached) in the
+            order of the inputs, where error is None on success and cached is
+            True if the outputs were copied from the cache
+    """
+    
+    directories = _directories(inputs, output)
+    
+    # The figures of inputs with the same name in the same directory would
+    # have the same path
+    figures = [
+        os.path.join(directory, os.path.splitext(os.path.basename(path))[0])
+        for path, directory in zip(inputs, directories)]
+    duplicates = sorted(set(x for x in figures if figures.count(x) > 1))
+    if duplicates:
+        raise Exception(
+            "Inputs would overwrite each other's outputs: "
+            + ", ".join(f"{x}.*" for x in duplicates))
+    
+    for directory in set(directories):
+        os.makedirs(directory, exist_ok=True)
+    
+    results = {}
+    # Input of each output path
+    owners = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=_initialize) as executor:
+        futures = {
+            executor.submit(
+                render, os.path.abspath(path), os.path.abspath(directory),
+                formats, dpi, cache,
+                [os.path.abspath(x) for x in dependencies or []]): path
+            for path, directory in zip(inputs, directories)}
+        for future in concurrent.futures.as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself failed
+                result = (path, [], 0, f"{type(e).__name__}: {e}", False)
+            else:
+                result = (path, *result[1:])
+            
+            # Other files written by the scripts may still collide
+            overwritten = [
+                x for x in result[1] if owners.setdefault(x, path) != path]
+            if overwritten and result[3] is None:
+                result = (
+                    *result[:3],
+                    "Outputs of other inputs overwritten: "
+                    + ", ".join(overwritten),
+                    result[4])
+            results[path] = result
+            
+            if report:
+                _report(*result)
+    
+    return [results[path] for path in inputs]
+
+def render(
+        path, output, formats, dpi=None, cache=None, dependencies=None):
+    """ Render a Python script or a saved diagram in the current process.
+        
+        Scripts are run in a private directory, as with "python path", and
+        each figure left open by the script is saved as "<name>.<format>", or
+        "<name>-<index>.<format>" if it created several figures. A saved
+        diagram is loaded in a new figure. The figures and the other files
+        written by the script are then moved to the output directory.
+        
+        If a cache is specified, the outputs are copied from the cache when
+        the content of the input, of the dependencies, the formats and the
+        resolution did not change. For a script, this also includes the
+        content of the modules loaded from its directory, as recorded by its
+        last rendering.
+        
+        :param dependencies: paths to other files read by the input (e.g.
+            data files)
+        :return: input, outputs, duration, error message (None on success),
+            and whether the outputs were copied from the cache
+    """
+    
+    begin = time.perf_counter()
+    
+    is_diagram = path.endswith((".json", ".npz", ".seq"))
+    # Paths of the modules loaded from the directory of a script, relative to
+    # this directory
+    modules = []
+    
+    if cache is not None:
+        base = cache.key(
+            *[_content(x) for x in [path, *(dependencies or [])]],
+            os.path.basename(path), sorted(formats), dpi)
+        if not is_diagram:
+            # The modules of a script are only known after running it
+            modules = _load_modules(cache, base)
+        if modules is not None:
+            outputs = cache.load(_key(cache, base, path, modules), output)
+            if outputs is not None:
+                return path, outputs, time.perf_counter()-begin, None, True
+    
+    import matplotlib.pyplot
+    
+    name = os.path.splitext(os.path.basename(path))[0]
+    outputs = []
+    directory = os.getcwd()
+    # All files in the working directory are outputs of this input
+    working_directory = tempfile.mkdtemp(prefix=".mrsd-render-", dir=output)
+    try:
+        matplotlib.pyplot.close("all")
+        os.chdir(working_directory)
+        if is_diagram:
+            from .diagram import Diagram
+            figure, plot = matplotlib.pyplot.subplots(tight_layout=True)
+            Diagram.load(plot, path)
+        else:
+            import runpy
+            sys.path.insert(0, os.path.dirname(path))
+            try:
+                runpy.run_path(path, run_name="__main__")
+            except SystemExit as e:
+                # As with "python path", only a non-zero status is a failure
+                if e.code not in [0, None]:
+                    raise
+            finally:
+                sys.path.remove(os.path.dirname(path))
+                modules = _local_modules(path)
+        
+        numbers = matplotlib.pyplot.get_fignums()
+        for index, number in enumerate(numbers):
+            figure = matplotlib.pyplot.figure(number)
+            suffix = f"-{1+index}" if len(numbers) > 1 else ""
+            for format_ in formats:
+                figure.savefig(
+                    f"{name}{suffix}.{format_}", dpi=dpi or "figure")
+        
+        filenames = sorted(os.listdir(working_directory))
+        # Only plain files are cached
+        if cache is not None and all(os.path.isfile(x) for x in filenames):
+            if not is_diagram:
+                _store_modules(cache, base, modules)
+            cache.store(
+                _key(cache, base, path, modules),
+                [os.path.abspath(x) for x in filenames])
+        for filename in filenames:
+            os.replace(
+                os.path.join(working_directory, filename),
+                os.path.join(output, filename))
+            outputs.append(os.path.join(output, filename))
+        error = None
+    except (Exception, SystemExit):
+        error = traceback.format_exc()
+    finally:
+        os.chdir(directory)
+        matplotlib.pyplot.close("all")
+        shutil.rmtree(working_directory, ignore_errors=True)
+    
+    return path, outputs, time.perf_counter()-begin, error, False
+
+def _directories(inputs, output):
+    """ Return the output directory of each input: its directory relative to
+        the common directory of all inputs, under the output directory.
+    """
+    
+    directories = [os.path.dirname(os.path.abspath(x)) for x in inputs]
+    common = os.path.commonpath(directories)
+    return [
+        os.path.normpath(os.path.join(output, os.path.relpath(x, common)))
+        for x in directories]
+
+def _content(path):
+    with open(path, "rb") as fd:
+        return fd.read()
+
+def _key(cache, base, path, modules):
+    """ Return the key of the outputs of an input, from the key of the input
+        and the content of its local modules.
+    """
+    
+    contents = []
+    for module in modules:
+        try:
+            contents.append(
+                _content(os.path.join(os.path.dirname(path), module)))
+        except FileNotFoundError:
+            contents.append(None)
+    return cache.key(base, modules, *contents)
+
+def _local_modules(path):
+    """ Return the paths of the loaded modules located in the directory of a
+        script (or below), relative to this directory. This may include the
+        modules loaded by previous scripts of the same directory.
+    """
+    
+    directory = os.path.join(os.path.dirname(path), "")
+    modules = set()
+    for module in list(sys.modules.values()):
+        filename = getattr(module, "__file__", None)
+        if filename and os.path.abspath(filename).startswith(directory):
+            modules.add(os.path.relpath(filename, directory))
+    return sorted(modules)
+
+def _load_modules(cache, base):
+    """ Return the local modules recorded at the last rendering of an input,
+        or None if they are not in the cache.
+    """
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = cache.load(base, directory)
+        if paths is None:
+            return None
+        with open(paths[0]) as fd:
+            return json.load(fd)
+
+def _store_modules(cache, base, modules):
+    """ Record the local modules of an input in the cache, replacing the
+        previous record.
+    """
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "modules.json")
+        with open(path, "w") as fd:
+            json.dump(modules, fd)
+        cache.remove(base)
+        cache.store(base, [path])
+
+def _initialize():
+    """ Set up the worker processes: non-interactive rendering.
+    """
+    
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+    matplotlib.pyplot.show = lambda *args, **kwargs: None
+
+def _report(path, outputs, duration, error, cached):
+    if error is None:
+        print(
+            f"{duration:8.3f}s  {path} -> {', '.join(outputs)}"
+            + (" (cached)" if cached else ""))
+    else:
+        last = error.strip().splitlines()[-1]
+        print(f"{duration:8.3f}s  {path} FAILED: {last}")
+        print(error, file=sys.stderr)
+
+if __name__ == "__main__":
+    sys.exit(main())
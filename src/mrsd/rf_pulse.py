@@ -1,7 +1,12 @@
+import functools
+
 import matplotlib.path
 import numpy
 
-from .event import Event
+from .event import Event, GeometryAttribute, display_points
+
+# Normalized waveform of box envelopes
+_box = (numpy.array([0., 0., 1., 1.]), numpy.array([0., 1., 1., 0.]))
 
 def box_envelope(pulse):
     return (
@@ -9,23 +14,119 @@ def box_envelope(pulse):
         [0, pulse.amplitude, pulse.amplitude, 0])
 
 def gaussian_envelope(pulse):
-    support = numpy.linspace(-1, +1, pulse.points)
-    xs = support/(support[-1]-support[0])*(pulse.end-pulse.begin)+pulse.center
+    xs, ys = gaussian_template(pulse.sd, pulse.points, pulse.tolerance)
+    return xs*(pulse.end-pulse.begin)+pulse.center, pulse.amplitude*ys
+
+def sinc_envelope(pulse):
+    xs, ys = sinc_template(
+        pulse.lobes, pulse.apodization, pulse.points, pulse.tolerance)
+    return xs*(pulse.end-pulse.begin)+pulse.center, pulse.amplitude*ys
+
+def array_envelope(samples, tolerance=1e-3):
+    """ Return an envelope function drawing sampled values (e.g. an imported
+        pulse shape), spread uniformly over the duration of the pulse and
+        normalized by their maximal magnitude. The samples are simplified once
+        to a polyline within the tolerance (see :func:`simplify`).
+        
+        :param samples: values of the envelope, at least 2
+        :param tolerance: maximal deviation of the polyline, relative to the
+            duration and to the amplitude of the pulse (None to keep all
+            samples)
+    """
     
-    ys = pulse.amplitude * numpy.exp(-support**2 / (2*pulse.sd**2))
+    ys = numpy.asarray(samples, float)
+    if len(ys) < 2:
+        raise Exception("Array envelopes require at least 2 samples")
+    peak = numpy.abs(ys).max()
+    if peak > 0:
+        ys = ys/peak
+    return _template_envelope(
+        _simplified(numpy.linspace(-0.5, 0.5, len(ys)), ys, tolerance))
+
+def _template_envelope(template):
+    """ Return an envelope function drawing a normalized template.
+    """
     
-    return xs, ys
+    def envelope(pulse):
+        xs, ys = template
+        return xs*(pulse.end-pulse.begin)+pulse.center, pulse.amplitude*ys
+    # Normalized waveform, shared by all pulses using this envelope
+    envelope.template = template
+    return envelope
 
-def sinc_envelope(pulse):
-    support = numpy.linspace(-pulse.lobes, +pulse.lobes, pulse.points)
-    xs = support/(support[-1]-support[0])*(pulse.end-pulse.begin)+pulse.center
+# The templates are normalized envelopes, centered on 0, with a duration and
+# an amplitude of 1. They are shared between pulses, and must not be modified.
+
+@functools.lru_cache(maxsize=128)
+def gaussian_template(sd, points, tolerance=None):
+    """ Return the normalized support and unit-amplitude Gaussian envelope,
+        simplified within the tolerance if specified.
+    """
+    
+    support = numpy.linspace(-1, +1, points)
+    xs = support/(support[-1]-support[0])
+    ys = numpy.exp(-support**2 / (2*sd**2))
+    
+    return _simplified(xs, ys, tolerance)
+
+@functools.lru_cache(maxsize=128)
+def sinc_template(lobes, apodization, points, tolerance=None):
+    """ Return the normalized support and unit-amplitude sinc envelope,
+        simplified within the tolerance if specified.
+    """
+    
+    support = numpy.linspace(-lobes, +lobes, points)
+    xs = support/(support[-1]-support[0])
     
     envelope = (
-        sinc if pulse.apodization is None
-        else globals()[f"{pulse.apodization}_sinc"])
-    ys = pulse.amplitude*envelope(pulse.lobes)(support)
+        sinc if apodization is None else globals()[f"{apodization}_sinc"])
+    ys = envelope(lobes)(support)
     
-    return xs, ys
+    return _simplified(xs, ys, tolerance)
+
+def simplify(xs, ys, tolerance):
+    """ Return the indices of the vertices of a polyline kept by the
+        Ramer-Douglas-Peucker algorithm: the removed vertices are closer than
+        the tolerance to the simplified polyline. The first and last vertices
+        are always kept.
+    """
+    
+    xs, ys = numpy.asarray(xs, float), numpy.asarray(ys, float)
+    keep = numpy.zeros(len(xs), bool)
+    keep[[0, -1]] = True
+    
+    stack = [(0, len(xs)-1)]
+    while stack:
+        first, last = stack.pop()
+        if last-first < 2:
+            continue
+        
+        # Distance of the inner vertices to the chord
+        dx, dy = xs[last]-xs[first], ys[last]-ys[first]
+        px, py = xs[first+1:last]-xs[first], ys[first+1:last]-ys[first]
+        length = numpy.hypot(dx, dy)
+        distance = (
+            numpy.abs(dx*py-dy*px)/length if length > 0
+            else numpy.hypot(px, py))
+        
+        farthest = numpy.argmax(distance)
+        if distance[farthest] > tolerance:
+            middle = first+1+farthest
+            keep[middle] = True
+            stack.extend([(first, middle), (middle, last)])
+    
+    return numpy.flatnonzero(keep)
+
+def _simplified(xs, ys, tolerance):
+    if tolerance is not None:
+        keep = simplify(xs, ys, tolerance)
+        xs, ys = xs[keep], ys[keep]
+    return _read_only(xs, ys)
+
+def _read_only(*arrays):
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
 
 class RFPulse(Event):
     """ RF pulse event, represented by a user-defined envelope
@@ -41,26 +142,80 @@ class RFPulse(Event):
         :param sd: standard deviation of a Gaussian envelope (defaults to 0.3)
         :param points: number of points used to draw the envelope (defaults to
             101)
+        :param tolerance: if specified, the vertices of the envelope closer
+            than this tolerance to a simplified polyline are not drawn. The
+            tolerance is relative to the duration and to the amplitude of the
+            pulse, e.g. 1e-3 is visually lossless (defaults to None). Envelopes
+            defined by samples are created by :func:`array_envelope`.
     """
     
+    envelope = GeometryAttribute()
+    sd = GeometryAttribute()
+    lobes = GeometryAttribute()
+    apodization = GeometryAttribute()
+    points = GeometryAttribute()
+    tolerance = GeometryAttribute()
+    
     def __init__(self, duration, amplitude, envelope=sinc_envelope, **kwargs):
         self.envelope = envelope
         self.sd = kwargs.pop("sd", 0.3)
         self.lobes = kwargs.pop("lobes", 3)
         self.apodization = kwargs.pop("apodization", None)
         self.points = kwargs.pop("points", 101)
+        self.tolerance = kwargs.pop("tolerance", None)
         super().__init__(duration, amplitude, **kwargs)
         
-    def get_path(self):
+    def _get_path(self):
         xs, ys = self.envelope(self)
+        if (
+                self.tolerance is not None and self.amplitude != 0
+                and not hasattr(self.envelope, "template")
+                and self.envelope not in [sinc_envelope, gaussian_envelope]):
+            # User envelope, simplified in normalized coordinates
+            xs, ys = numpy.asarray(xs, float), numpy.asarray(ys, float)
+            keep = simplify(
+                (xs-self.begin)/self.duration, ys/self.amplitude,
+                self.tolerance)
+            xs, ys = xs[keep], ys[keep]
         return matplotlib.path.Path(numpy.transpose([xs, ys]))
     
+    def get_display_path(self, width):
+        # Only the pre-defined sampled envelopes have a reduced level of detail
+        points = display_points(width, self.points)
+        if (
+                points == self.points
+                or self.envelope not in [sinc_envelope, gaussian_envelope]):
+            return self.get_path()
+        
+        if self.envelope is sinc_envelope:
+            xs, ys = sinc_template(
+                self.lobes, self.apodization, points, self.tolerance)
+        else:
+            xs, ys = gaussian_template(self.sd, points, self.tolerance)
+        return matplotlib.path.Path(numpy.transpose([
+            xs*self.duration+self.center, self.amplitude*ys]))
+    
+    def _waveform(self):
+        # Shared templates, with a normalized time between 0 and 1
+        if self.envelope is sinc_envelope:
+            xs, ys = sinc_template(self.lobes, self.apodization, self.points)
+        elif self.envelope is gaussian_envelope:
+            xs, ys = gaussian_template(self.sd, self.points)
+        elif self.envelope is box_envelope:
+            return _box
+        elif hasattr(self.envelope, "template"):
+            xs, ys = self.envelope.template
+        else:
+            return super()._waveform()
+        return xs+0.5, ys
+    
     @property
     def _fields(self):
         return {
             x: getattr(self, x) for x in [
                 "duration", "amplitude", "begin", "center", "end",
-                "envelope", "lobes", "apodization", "points"]}
+                "envelope", "sd", "lobes", "apodization", "points",
+                "tolerance"]}
 
 def apodized_sinc(N, alpha):
     return lambda t: ((1-alpha) + alpha*numpy.cos(numpy.pi*t/N)) * numpy.sinc(t)
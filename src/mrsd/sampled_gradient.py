@@ -0,0 +1,54 @@
+import matplotlib.path
+import numpy
+
+from .event import Event, GeometryAttribute
+from .gradient import Gradient
+
+class SampledGradient(Gradient):
+    """ Gradient event with an arbitrary waveform (e.g. an imported gradient
+        shape), represented by a polyline.
+        
+        :param duration: duration of the gradient
+        :param amplitude: maximum amplitude
+        :param envelope: waveform of the gradient, as the envelope of an RF
+            pulse (see :class:`mrsd.RFPulse`), e.g. created from samples by
+            :func:`mrsd.array_envelope`
+    """
+    
+    envelope = GeometryAttribute()
+    _trapezoid = False
+    _sampled = True
+    
+    def __init__(self, duration, amplitude, envelope, **kwargs):
+        self.envelope = envelope
+        Event.__init__(self, duration, amplitude, **kwargs)
+    
+    @property
+    def flat_top(self):
+        """ Duration of the waveform.
+        """
+        
+        return self.duration
+    
+    def _area(self):
+        xs, ys = self._waveform()
+        return self.amplitude * self.duration * numpy.sum(
+            (ys[1:]+ys[:-1])/2 * numpy.diff(xs))
+    
+    def _get_path(self):
+        xs, ys = self.envelope(self)
+        return matplotlib.path.Path(numpy.transpose([xs, ys]))
+    
+    def _waveform(self):
+        # Shared template, with a normalized time between 0 and 1
+        template = getattr(self.envelope, "template", None)
+        if template is None:
+            return super()._waveform()
+        xs, ys = template
+        return xs+0.5, ys
+    
+    @property
+    def _fields(self):
+        return {
+            x: getattr(self, x)
+            for x in ["duration", "amplitude", "envelope", "begin"]}
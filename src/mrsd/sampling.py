@@ -0,0 +1,81 @@
+import numpy
+
+from .index import spans
+
+def sample(table, channel, times, kind=None):
+    """ Sample the waveform of the events of a channel.
+        
+        Trapezoids (gradients) are evaluated in closed form; the other events
+        are grouped by shape and each group is interpolated in one pass.
+        Multi-gradients are sampled as their trapezoid of maximal amplitude.
+        The contributions of overlapping events are summed.
+        
+        :param table: :class:`mrsd.table.EventTable` of the events
+        :param channel: name of the channel
+        :param times: sorted sampling times
+        :param kind: if specified, only sample the events of this type
+            (including sub-classes)
+        :return: array of values, with the same shape as times
+    """
+    
+    times = numpy.asarray(times, float)
+    values = numpy.zeros(len(times))
+    if len(times) == 0:
+        return values
+    
+    rows = table.select(channel, kind, times[0], times[-1])
+    trapezoid = numpy.array(
+        [x._trapezoid for x in table.kinds], bool)[table.kind[rows]]
+    
+    values += _sample_trapezoids(table, rows[trapezoid], times)
+    
+    # Group the other events by waveform
+    groups = {}
+    for row in rows[~trapezoid]:
+        xs, ys = table.events[row]._waveform()
+        groups.setdefault(id(ys), (xs, ys, []))[2].append(row)
+    for xs, ys, group in groups.values():
+        group = numpy.array(group)
+        indices, events, elapsed = _support(table, group, times)
+        durations = table.end[group]-table.begin[group]
+        normalized = elapsed / numpy.where(durations>0, durations, 1)[events]
+        values += numpy.bincount(
+            indices,
+            table.amplitude[group][events]*numpy.interp(normalized, xs, ys),
+            len(times))
+    
+    return values
+
+def _sample_trapezoids(table, rows, times):
+    """ Sample trapezoids in closed form.
+    """
+    
+    indices, events, elapsed = _support(table, rows, times)
+    
+    duration = (table.end[rows]-table.begin[rows])[events]
+    ramp_up = table.ramp_up[rows][events]
+    ramp_down = table.ramp_down[rows][events]
+    
+    # Fraction of the amplitude on the ramp up and on the ramp down, the
+    # trapezoid is the minimum of both
+    up = numpy.divide(
+        elapsed, ramp_up, out=numpy.ones(len(elapsed)), where=ramp_up>0)
+    down = numpy.divide(
+        duration-elapsed, ramp_down, out=numpy.ones(len(elapsed)),
+        where=ramp_down>0)
+    fraction = numpy.clip(numpy.minimum(up, down), 0, 1)
+    
+    return numpy.bincount(
+        indices, table.amplitude[rows][events]*fraction, len(times))
+
+def _support(table, rows, times):
+    """ Return the indices of the samples covered by each event, the index
+        of the event (in rows) for each of them, and the time elapsed since the
+        begin of the event.
+    """
+    
+    begins, ends = table.begin[rows], table.end[rows]
+    indices, events = spans(
+        numpy.searchsorted(times, begins, "left"),
+        numpy.searchsorted(times, ends, "right"))
+    return indices, events, times[indices]-begins[events]
@@ -0,0 +1,254 @@
+def resolve_begin(duration, begin=None, end=None, center=None):
+    """ Return the begin time of an event given its begin, end, or center.
+    """
+    
+    if begin is not None:
+        return begin
+    elif center is not None:
+        return center - duration/2
+    elif end is not None:
+        return end - duration
+    else:
+        raise Exception("Missing time")
+
+class Record(object):
+    """ Compact description of a sequence event
+        
+        :param kind: type of event ("adc", "echo", "gradient", "multi_gradient",
+            "sampled_gradient" or "rf_pulse")
+        :param channel: name of the channel
+        :param begin: begin time
+        :param duration: total duration
+        :param amplitude: normalized amplitude between -1 and +1
+        :param parameters: type-specific parameters (e.g. ramps of gradients,
+            envelope of RF pulses) or None
+        :param style: style of the event (passed to matplotlib) or None
+    """
+    
+    __slots__ = (
+        "kind", "channel", "begin", "duration", "amplitude", "parameters",
+        "style")
+    
+    def __init__(
+            self, kind, channel, begin, duration, amplitude,
+            parameters=None, style=None):
+        self.kind = kind
+        self.channel = channel
+        self.begin = begin
+        self.duration = duration
+        self.amplitude = amplitude
+        self.parameters = parameters or None
+        self.style = style or None
+    
+    @property
+    def end(self):
+        return self.begin + self.duration
+    
+    @property
+    def center(self):
+        return self.begin + self.duration/2
+    
+    def move(self, offset):
+        """ Move on the time axis, return the object
+        """
+        
+        self.begin += offset
+        return self
+    
+    def copy(self):
+        """ Return a copy of the record.
+        """
+        
+        return Record(
+            self.kind, self.channel, self.begin, self.duration, self.amplitude,
+            dict(self.parameters or {}), dict(self.style or {}))
+    
+    def __repr__(self):
+        return (
+            f"Record({self.kind!r}, {self.channel!r}, begin={self.begin}, "
+            f"duration={self.duration}, amplitude={self.amplitude})")
+
+class Sequence(object):
+    """ MR sequence, as a list of event records on named channels. Unlike
+        :class:`mrsd.Diagram`, it does not depend on matplotlib: sequences can
+        be built, checked and transformed without a figure, then drawn by
+        :meth:`mrsd.Diagram.render`.
+        
+        :param channels: sequence of channels names, from top to bottom
+    """
+    
+    def __init__(self, channels):
+        self.channels = list(channels)
+        self.records = []
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __iter__(self):
+        return iter(self.records)
+    
+    def add(self, record):
+        """ Add a record to the sequence, return the record.
+        """
+        
+        if record.channel not in self.channels:
+            raise Exception(f"No such channel: {record.channel}")
+        self.records.append(record)
+        return record
+    
+    def events(self, channel=None, kind=None):
+        """ Return the records of a channel and kind (all channels and kinds if
+            None), in insertion order.
+        """
+        
+        return [
+            x for x in self.records
+            if (channel is None or x.channel == channel)
+                and (kind is None or x.kind == kind)]
+    
+    @property
+    def begin(self):
+        """ Begin time of the first event.
+        """
+        
+        return min((x.begin for x in self.records), default=None)
+    
+    @property
+    def end(self):
+        """ End time of the last event.
+        """
+        
+        return max((x.end for x in self.records), default=None)
+    
+    def move(self, offset):
+        """ Move all events on the time axis, return the object
+        """
+        
+        for record in self.records:
+            record.move(offset)
+        return self
+    
+    def adc(
+            self, channel, duration, begin=None, end=None, center=None,
+            **style):
+        """ Add an ADC record to the specified channel.
+        """
+        
+        return self.add(Record(
+            "adc", channel, resolve_begin(duration, begin, end, center),
+            duration, 1, style=style))
+    
+    def echo(
+            self, channel, duration, amplitude=1,
+            begin=None, end=None, center=None, **style):
+        """ Add an echo record to the specified channel.
+        """
+        
+        return self.add(Record(
+            "echo", channel, resolve_begin(duration, begin, end, center),
+            duration, amplitude, style=style))
+    
+    def gradient(
+            self, channel, flat_top, amplitude,
+            ramp=0, ramp_up=None, ramp_down=None,
+            begin=None, end=None, center=None, **style):
+        """ Add a gradient record to the specified channel.
+        """
+        
+        return self._trapezoid(
+            "gradient", channel, flat_top, amplitude, ramp, ramp_up, ramp_down,
+            begin, end, center, {}, style)
+    
+    def multi_gradient(
+            self, channel, flat_top, amplitude,
+            ramp=0, ramp_up=None, ramp_down=None, steps=5,
+            begin=None, end=None, center=None, **style):
+        """ Add a multi-gradient record to the specified channel.
+        """
+        
+        return self._trapezoid(
+            "multi_gradient", channel, flat_top, amplitude,
+            ramp, ramp_up, ramp_down, begin, end, center, {"steps": steps},
+            style)
+    
+    def sampled_gradient(
+            self, channel, duration, amplitude, envelope,
+            begin=None, end=None, center=None, **style):
+        """ Add a sampled gradient record to the specified channel. The
+            waveform is an envelope function (see :class:`mrsd.RFPulse`),
+            e.g. created by :func:`mrsd.array_envelope`.
+        """
+        
+        return self.add(Record(
+            "sampled_gradient", channel,
+            resolve_begin(duration, begin, end, center), duration, amplitude,
+            {"envelope": envelope}, style))
+    
+    def rf_pulse(
+            self, channel, duration, amplitude, envelope="sinc",
+            begin=None, end=None, center=None, **kwargs):
+        """ Add an RF pulse record to the specified channel. The envelope is
+            either a function (see :class:`mrsd.RFPulse`) or the name of a
+            pre-defined envelope ("sinc", "gaussian" or "box"). The envelope
+            parameters (lobes, apodization, sd, points, tolerance) are passed
+            as keyword arguments, the other keyword arguments define the style.
+        """
+        
+        parameters = {"envelope": envelope}
+        for name in ["sd", "lobes", "apodization", "points", "tolerance"]:
+            if name in kwargs:
+                parameters[name] = kwargs.pop(name)
+        
+        return self.add(Record(
+            "rf_pulse", channel, resolve_begin(duration, begin, end, center),
+            duration, amplitude, parameters, kwargs))
+    
+    def _trapezoid(
+            self, kind, channel, flat_top, amplitude, ramp, ramp_up, ramp_down,
+            begin, end, center, parameters, style):
+        ramp_up = ramp_up if ramp_up is not None else ramp
+        ramp_down = ramp_down if ramp_down is not None else ramp
+        duration = ramp_up + flat_top + ramp_down
+        
+        return self.add(Record(
+            kind, channel, resolve_begin(duration, begin, end, center),
+            duration, amplitude,
+            {
+                "flat_top": flat_top, "ramp_up": ramp_up,
+                "ramp_down": ramp_down, **parameters},
+            style))
+
+def to_event(record):
+    """ Return the :class:`mrsd.Event` described by a record.
+    """
+    
+    # Deferred imports: the sequence model does not depend on matplotlib
+    from .adc import ADC
+    from .echo import Echo
+    from .gradient import Gradient
+    from .multi_gradient import MultiGradient
+    from . import rf_pulse
+    from .sampled_gradient import SampledGradient
+    
+    parameters = dict(record.parameters or {})
+    kwargs = dict(record.style or {}, begin=record.begin)
+    
+    if record.kind == "adc":
+        return ADC(record.duration, **kwargs)
+    elif record.kind == "echo":
+        return Echo(record.duration, record.amplitude, **kwargs)
+    elif record.kind in ["gradient", "multi_gradient"]:
+        class_ = Gradient if record.kind == "gradient" else MultiGradient
+        return class_(
+            parameters.pop("flat_top"), record.amplitude,
+            **parameters, **kwargs)
+    elif record.kind in ["rf_pulse", "sampled_gradient"]:
+        class_ = (
+            rf_pulse.RFPulse if record.kind == "rf_pulse" else SampledGradient)
+        envelope = parameters.pop("envelope", "sinc")
+        if isinstance(envelope, str):
+            envelope = getattr(rf_pulse, f"{envelope}_envelope")
+        return class_(
+            record.duration, record.amplitude, envelope, **parameters, **kwargs)
+    else:
+        raise Exception(f"Unknown event kind: {record.kind}")
@@ -0,0 +1,365 @@
+import functools
+import json
+import math
+
+import matplotlib.patches
+import numpy
+
+from .adc import ADC
+from .echo import Echo
+from .gradient import Gradient
+from .multi_gradient import MultiGradient
+from . import rf_pulse
+from .sampled_gradient import SampledGradient
+from .sequence import Record, to_event
+
+# Version of the schema, increased when it changes in an incompatible way
+version = 1
+
+# Event types, by kind of record
+_kinds = {
+    "adc": ADC, "echo": Echo, "gradient": Gradient,
+    "multi_gradient": MultiGradient, "rf_pulse": rf_pulse.RFPulse,
+    "sampled_gradient": SampledGradient}
+
+# Style properties, saved when they differ from the default style of events
+_style = [
+    "alpha", "antialiased", "capstyle", "edgecolor", "facecolor", "fill",
+    "hatch", "joinstyle", "label", "linestyle", "linewidth", "visible",
+    "zorder"]
+
+# Fields stored in the record itself rather than in its parameters
+_geometry = ["duration", "amplitude", "begin", "center", "end"]
+
+# Parameters of trapezoids, stored as columns in the NumPy format
+_ramps = ["flat_top", "ramp_up", "ramp_down"]
+
+def save(diagram, path):
+    """ Save the events, annotations and intervals of a diagram. The format is
+        NumPy columns (compressed) if the path ends with ".npz", JSON
+        otherwise.
+        
+        :param diagram: :class:`mrsd.Diagram` to save
+        :param path: path to the file
+    """
+    
+    metadata, events = describe(diagram)
+    if str(path).endswith(".npz"):
+        _save_npz(path, metadata, events)
+    else:
+        with open(path, "w") as fd:
+            json.dump(_plain({**metadata, "events": events}), fd, indent=1)
+
+def describe(diagram):
+    """ Return the description of a diagram as plain values: the metadata
+        (channels from top to bottom, hidden channels, annotations, intervals)
+        and the list of events.
+    """
+    
+    diagram._flush()
+    
+    table = diagram.table
+    rows = numpy.flatnonzero(table.alive)
+    events = [
+        _describe(table.channels[channel], event)
+        for channel, event in zip(table.channel[rows], table.get(rows))]
+    
+    return _metadata(diagram), events
+
+def _metadata(diagram):
+    """ Return the metadata of a diagram: channels, annotations and
+        intervals.
+    """
+    
+    table = diagram.table
+    
+    # Annotations and intervals are placed after the events saved before them
+    after = numpy.concatenate([[0], numpy.cumsum(table.alive, dtype=int)])
+    return {
+        "format": "mrsd", "version": version,
+        "channels": list(diagram._channels),
+        "hidden": [
+            name for name, channel in diagram._channels.items()
+            if not channel.visible],
+        "collections": diagram._use_collections,
+        **{
+            name: [
+                {"after": after[rows], "parameters": parameters}
+                for rows, parameters in getattr(diagram, f"_{name}")]
+            for name in ["annotations", "intervals"]}}
+
+def load(plot, path):
+    """ Load a diagram saved by :func:`save` in a new :class:`mrsd.Diagram`.
+        Pulseq sequences (.seq) are imported by :func:`mrsd.pulseq.load`.
+        
+        :param plot: an instance of matplotlib axes (plot, subplot, etc.)
+        :param path: path to the file
+    """
+    
+    if str(path).endswith(".seq"):
+        from . import pulseq
+        return pulseq.load(plot, path)
+    elif str(path).endswith(".npz"):
+        metadata, events = _load_npz(path)
+    else:
+        with open(path) as fd:
+            metadata = json.load(fd)
+        events = metadata.pop("events")
+    
+    if metadata.get("format") != "mrsd":
+        raise Exception(f"Not a diagram: {path}")
+    if metadata["version"] > version:
+        raise Exception(f"Unsupported version: {metadata['version']}")
+    
+    from .diagram import Diagram
+    diagram = Diagram(plot, metadata["channels"], metadata["collections"])
+    _build(diagram, metadata, events, {}, {})
+    
+    return diagram
+
+def _build(diagram, metadata, events, prototypes, envelopes, paths=None):
+    """ Add described events, annotations and intervals to a diagram, and
+        hide its hidden channels.
+        
+        :param prototypes,envelopes: caches of prototype events and of array
+            envelopes, which may be shared by several diagrams
+        :param paths: paths of the events, if already known
+    """
+    
+    # Annotations and intervals, in the order of the events
+    extras = sorted(
+        [
+            (x["after"], diagram.annotate, x["parameters"])
+            for x in metadata["annotations"]]
+        + [
+            (x["after"], diagram.interval, x["parameters"])
+            for x in metadata["intervals"]],
+        key=lambda x: x[0])
+    
+    # Events with the same type, style and parameters (except their geometry)
+    # are replicated from a prototype, which is faster than constructing them
+    with diagram.batch():
+        for index, description in enumerate(events):
+            while extras and extras[0][0] <= index:
+                _, function, parameters = extras.pop(0)
+                function(**parameters)
+            
+            group = description.get("group") or _group(description)
+            prototype = prototypes.get(group)
+            if prototype is None:
+                prototype = _prototype(description, envelopes)
+                prototypes[group] = prototype
+            
+            parameters = description.get("parameters") or {}
+            event = prototype._replicate(
+                description["begin"], description["duration"],
+                description["amplitude"],
+                **{x: parameters[x] for x in _ramps if x in parameters})
+            event.offset[:] = description.get("offset", [0, 0])
+            if paths is not None:
+                event._path = paths[index]
+            diagram._add(
+                description["channel"], event,
+                description.get("collected", False))
+    
+    for _, function, parameters in extras:
+        function(**parameters)
+    
+    for name in metadata.get("hidden", []):
+        diagram.hide_channel(name)
+
+def _group(description):
+    """ Return the key of the prototype of an event.
+    """
+    
+    parameters = {
+        name: value
+        for name, value in (description.get("parameters") or {}).items()
+        if name not in _ramps}
+    return json.dumps(
+        [description["kind"], parameters, description.get("style")],
+        sort_keys=True)
+
+def _prototype(description, envelopes):
+    """ Create the event described by a dictionary. Array envelopes are
+        shared between events through the envelopes cache.
+    """
+    
+    parameters = dict(description.get("parameters") or {})
+    if isinstance(parameters.get("envelope"), dict):
+        key = json.dumps(parameters["envelope"])
+        if key not in envelopes:
+            envelopes[key] = rf_pulse._template_envelope(
+                rf_pulse._read_only(
+                    *[
+                        numpy.array(x, float)
+                        for x in parameters["envelope"]["template"]]))
+        parameters["envelope"] = envelopes[key]
+    
+    style = dict(description.get("style") or {})
+    if isinstance(style.get("linestyle"), list):
+        offset, dashes = style["linestyle"]
+        style["linestyle"] = (offset, tuple(dashes))
+    
+    return to_event(Record(
+        description["kind"], description["channel"], description["begin"],
+        description["duration"], description["amplitude"], parameters, style))
+
+def _describe(channel, event):
+    """ Return the description of an event as a dictionary of plain values.
+    """
+    
+    for kind, type_ in _kinds.items():
+        if type(event) is type_:
+            break
+    else:
+        raise Exception(f"Cannot save events of type {type(event).__name__}")
+    
+    parameters = {
+        name: value for name, value in event._fields.items()
+        if name not in _geometry}
+    if "envelope" in parameters:
+        parameters["envelope"] = _envelope(parameters["envelope"])
+    
+    default = _default_style()
+    style = {}
+    for name in _style:
+        # Style of the event itself, regardless of the visibility of its
+        # channel
+        getter = getattr(matplotlib.patches.Patch, f"get_{name}")
+        value = _plain(getter(event))
+        if value != default[name]:
+            style[name] = value
+    
+    description = {
+        "kind": kind, "channel": channel, "begin": event.begin,
+        "duration": event.duration, "amplitude": event.amplitude}
+    if parameters:
+        description["parameters"] = parameters
+    if style:
+        description["style"] = style
+    
+    # Offset in the coordinates of the channel
+    if event.offset.any():
+        description["offset"] = event.offset.tolist()
+    # Events drawn in a collection are not added to the axes
+    if event.axes is None:
+        description["collected"] = True
+    
+    return description
+
+def _envelope(envelope):
+    """ Return the name of a pre-defined envelope, or the template of an
+        array envelope.
+    """
+    
+    for name in ["sinc", "gaussian", "box"]:
+        if envelope is getattr(rf_pulse, f"{name}_envelope"):
+            return name
+    template = getattr(envelope, "template", None)
+    if template is None:
+        raise Exception(f"Cannot save envelope {envelope}")
+    return {"template": [x.tolist() for x in template]}
+
+@functools.lru_cache(maxsize=1)
+def _default_style():
+    patch = matplotlib.patches.Patch(
+        edgecolor="black", facecolor="none", linewidth=1)
+    return {name: _plain(getattr(patch, f"get_{name}")()) for name in _style}
+
+def _plain(value):
+    """ Convert tuples and NumPy values to JSON types, recursively.
+    """
+    
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    elif isinstance(value, (list, tuple, numpy.ndarray)):
+        return [_plain(x) for x in value]
+    elif isinstance(value, numpy.generic):
+        return value.item()
+    else:
+        return value
+
+def _save_npz(path, metadata, events):
+    """ Save the events as columns: the geometry of the events is stored in
+        numerical arrays, their other parameters and their styles are stored
+        once per distinct value and referenced by index.
+    """
+    
+    # Distinct values, and their index
+    kinds, parameters, styles = {}, {}, {}
+    def index(values, value):
+        return values.setdefault(
+            json.dumps(_plain(value), sort_keys=True), len(values))
+    
+    columns = {
+        name: [] for name in [
+            "kind", "channel", "begin", "duration", "amplitude", *_ramps,
+            "offset", "collected", "parameters", "style"]}
+    for description in events:
+        columns["kind"].append(index(kinds, description["kind"]))
+        columns["channel"].append(
+            metadata["channels"].index(description["channel"]))
+        for name in ["begin", "duration", "amplitude"]:
+            columns[name].append(description[name])
+        
+        # Ramps are not defined (NaN) for events other than trapezoids
+        description_parameters = dict(description.get("parameters", {}))
+        for name in _ramps:
+            columns[name].append(description_parameters.pop(name, numpy.nan))
+        columns["parameters"].append(index(parameters, description_parameters))
+        columns["style"].append(index(styles, description.get("style", {})))
+        
+        columns["offset"].append(description.get("offset", [0, 0]))
+        columns["collected"].append(description.get("collected", False))
+    
+    metadata = {
+        **metadata,
+        **{
+            name: [json.loads(x) for x in values]
+            for name, values in [
+                ("kinds", kinds), ("parameters", parameters),
+                ("styles", styles)]}}
+    
+    types = {
+        "kind": int, "channel": int, "collected": bool, "parameters": int,
+        "style": int}
+    numpy.savez_compressed(
+        path, metadata=numpy.array(json.dumps(_plain(metadata))),
+        **{
+            name: numpy.array(values, types.get(name, float))
+            for name, values in columns.items() if name != "offset"},
+        offset=numpy.array(columns["offset"], float).reshape(-1, 2))
+
+def _load_npz(path):
+    """ Return the metadata and the descriptions of the events saved by
+        :func:`_save_npz`.
+    """
+    
+    # Single load of all columns
+    with numpy.load(path) as data:
+        columns = {name: data[name].tolist() for name in data.files}
+    
+    metadata = json.loads(columns.pop("metadata"))
+    kinds = metadata.pop("kinds")
+    parameters = metadata.pop("parameters")
+    styles = metadata.pop("styles")
+    
+    events = []
+    for row in zip(*columns.values()):
+        row = dict(zip(columns.keys(), row))
+        description = {
+            "kind": kinds[row["kind"]],
+            "channel": metadata["channels"][row["channel"]],
+            "begin": row["begin"], "duration": row["duration"],
+            "amplitude": row["amplitude"],
+            "parameters": dict(parameters[row["parameters"]]),
+            "style": styles[row["style"]], "offset": row["offset"],
+            "collected": row["collected"],
+            "group": (row["kind"], row["parameters"], row["style"])}
+        if not math.isnan(row["ramp_up"]):
+            description["parameters"].update(
+                {name: row[name] for name in _ramps})
+        events.append(description)
+    
+    return metadata, events
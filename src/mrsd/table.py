@@ -0,0 +1,227 @@
+import numpy
+
+from .index import IntervalIndex, spans
+
+class EventTable(object):
+    """ Columnar store of the events of a diagram, for vectorized queries.
+        
+        Each event is stored in a row of NumPy arrays (channel index, kind
+        index, begin, end, amplitude, ramps). The rows are updated when the
+        geometry of an event changes, and removed events are masked. The events
+        of each channel are also kept in a time index (see
+        :class:`mrsd.index.IntervalIndex`) for window queries.
+        
+        :param channels: names of the channels, indexed by the channel column
+    """
+    
+    # Numerical columns and their types
+    _columns = {
+        "channel": int, "kind": int, "begin": float, "end": float,
+        "amplitude": float, "ramp_up": float, "ramp_down": float,
+        "alive": bool}
+    
+    def __init__(self, channels):
+        self.channels = list(channels)
+        
+        # Event types, indexed by the kind column
+        self.kinds = []
+        
+        self.events = []
+        # Instrumentation of the events, see mrsd.profiling.Stats
+        self.stats = None
+        self._rows = {}
+        self._indices = [IntervalIndex() for _ in self.channels]
+        self._size = 0
+        self._data = {
+            name: numpy.zeros(16, type_)
+            for name, type_ in self._columns.items()}
+    
+    def __len__(self):
+        return int(self.alive.sum())
+    
+    def __getattr__(self, name):
+        # Columns are exposed as read-only views of the used rows
+        data = self.__dict__.get("_data")
+        if data is None or name not in data:
+            raise AttributeError(name)
+        view = data[name][:self._size].view()
+        view.setflags(write=False)
+        return view
+    
+    def add_channel(self, channel):
+        """ Add an empty channel. The order of the channels in the table does
+            not depend on their order in the diagram.
+        """
+        
+        self.channels.append(channel)
+        self._indices.append(IntervalIndex())
+    
+    def append(self, channel, event):
+        """ Add an event on the specified channel, return its row.
+        """
+        
+        if self._size == len(self._data["alive"]):
+            for name, column in self._data.items():
+                self._data[name] = numpy.concatenate(
+                    (column, numpy.zeros_like(column)))
+        
+        row = self._size
+        self._size += 1
+        
+        kind = type(event)
+        if kind not in self.kinds:
+            self.kinds.append(kind)
+        
+        self._data["channel"][row] = self.channels.index(channel)
+        self._data["kind"][row] = self.kinds.index(kind)
+        self._data["alive"][row] = True
+        self.events.append(event)
+        self._rows[id(event)] = row
+        
+        event._table = self
+        self._write(row, event)
+        self._indices[self._data["channel"][row]].insert(
+            row, self._data["begin"][row], self._data["end"][row])
+        
+        return row
+    
+    def update(self, event):
+        """ Update the row of an event after a change of its geometry.
+        """
+        
+        row = self._rows[id(event)]
+        index = self._indices[self._data["channel"][row]]
+        index.remove(row, self._data["begin"][row])
+        self._write(row, event)
+        index.insert(row, self._data["begin"][row], self._data["end"][row])
+    
+    def _write(self, row, event):
+        self._data["begin"][row] = event.begin
+        self._data["end"][row] = event.begin + event.duration
+        self._data["amplitude"][row] = event.amplitude
+        self._data["ramp_up"][row] = getattr(event, "ramp_up", 0)
+        self._data["ramp_down"][row] = getattr(event, "ramp_down", 0)
+    
+    def remove(self, event):
+        """ Mask the row of an event.
+        """
+        
+        row = self._rows.pop(id(event))
+        self._indices[self._data["channel"][row]].remove(
+            row, self._data["begin"][row])
+        self._data["alive"][row] = False
+        self.events[row] = None
+        event._table = None
+    
+    def row(self, event):
+        """ Return the row of an event.
+        """
+        
+        return self._rows[id(event)]
+    
+    def select(self, channel=None, kind=None, begin=None, end=None):
+        """ Return the rows of the events matching all the given criteria.
+            
+            :param channel: name of the channel
+            :param kind: event type (e.g. mrsd.Gradient), including sub-classes
+            :param begin,end: time window: only the events intersecting the
+                window are selected
+        """
+        
+        if channel is not None and (begin is not None or end is not None):
+            # Use the time index of the channel
+            rows = self.window(
+                channel,
+                begin if begin is not None else -numpy.inf,
+                end if end is not None else numpy.inf)
+            if kind is not None:
+                rows = rows[self._kind_mask(kind)[rows]]
+            return numpy.sort(rows)
+        
+        mask = self.alive.copy()
+        if channel is not None:
+            mask &= (self.channel == self.channels.index(channel))
+        if kind is not None:
+            mask &= self._kind_mask(kind)
+        if begin is not None:
+            mask &= (self.end >= begin)
+        if end is not None:
+            mask &= (self.begin <= end)
+        
+        return numpy.flatnonzero(mask)
+    
+    def window(self, channel, begin, end=None):
+        """ Return the rows of the events of a channel intersecting a time
+            window (or active at a given time if end is None), sorted by begin
+            time.
+        """
+        
+        end = begin if end is None else end
+        index = self._indices[self.channels.index(channel)]
+        return numpy.array(index.window(begin, end), int)
+    
+    def overlaps(self, channel=None, kind=None):
+        """ Return the pairs of rows of overlapping events of the same channel
+            (events which only touch do not overlap), as an array of shape
+            (N, 2).
+            
+            :param channel: name of the channel (all channels if None)
+            :param kind: event type (e.g. mrsd.Gradient), including sub-classes
+        """
+        
+        channels = (
+            range(len(self.channels)) if channel is None
+            else [self.channels.index(channel)])
+        
+        pairs = [numpy.empty((0, 2), int)]
+        for channel in channels:
+            rows = numpy.array(self._indices[channel].rows(), int)
+            if kind is not None:
+                rows = rows[self._kind_mask(kind)[rows]]
+            
+            # Since the begin times are sorted, the events overlapping event i
+            # and starting after it are the events i+1 to stop[i]-1
+            begins, ends = self.begin[rows], self.end[rows]
+            stop = numpy.searchsorted(begins, ends, "left")
+            second, first = spans(numpy.arange(1, 1+len(rows)), stop)
+            pairs.append(numpy.transpose([rows[first], rows[second]]))
+        
+        return numpy.concatenate(pairs)
+    
+    def _kind_mask(self, kind):
+        """ Return the mask of the events of a type, including sub-classes.
+        """
+        
+        kinds = [i for i, x in enumerate(self.kinds) if issubclass(x, kind)]
+        return numpy.isin(self.kind, kinds)
+    
+    def get(self, rows):
+        """ Return the events of the given rows.
+        """
+        
+        return [self.events[x] for x in rows]
+    
+    def durations(self):
+        """ Return the total duration of the events of each channel.
+        """
+        
+        totals = numpy.bincount(
+            self.channel, weights=(self.end-self.begin)*self.alive,
+            minlength=len(self.channels))
+        return dict(zip(self.channels, totals))
+    
+    def begin_time(self, channel=None):
+        """ Return the begin time of the first event (on the channel if
+            specified), or None if there is no event.
+        """
+        
+        rows = self.select(channel)
+        return self.begin[rows].min() if len(rows) else None
+    
+    def end_time(self, channel=None):
+        """ Return the end time of the last event (on the channel if
+            specified), or None if there is no event.
+        """
+        
+        rows = self.select(channel)
+        return self.end[rows].max() if len(rows) else None
@@ -0,0 +1,118 @@
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure
+import mrsd
+import numpy
+
+class TestLimits(unittest.TestCase):
+    def setUp(self):
+        self.plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram(self.plot, ["RF", "G"])
+        self.diagram.rf_pulse("RF", 1, 1, center=0)
+        self.diagram.gradient("G", 1, 1, ramp=0.1, center=0)
+        # Curve drawn by the user, beyond the events
+        self.plot.plot([0, 20], [0, 3])
+    
+    def assert_curve_visible(self):
+        left, right = self.plot.get_xlim()
+        bottom, top = self.plot.get_ylim()
+        self.assertLessEqual(left, 0)
+        self.assertGreaterEqual(right, 20)
+        self.assertLessEqual(bottom, 0)
+        self.assertGreaterEqual(top, 3)
+    
+    def test_move_channel(self):
+        self.diagram.move_channel("G", 0)
+        self.assert_curve_visible()
+    
+    def test_hide_channel(self):
+        self.diagram.hide_channel("RF")
+        self.assert_curve_visible()
+        self.diagram.hide_channel("RF", False)
+        self.assert_curve_visible()
+    
+    def test_set_params(self):
+        self.diagram.set_params(amplitude=1)
+        self.diagram.template(
+            self.diagram.gradient, "G", 1, self.diagram.params.amplitude,
+            center=5)
+        self.diagram.set_params(amplitude=2)
+        self.diagram.set_params(amplitude=0.5)
+        self.assert_curve_visible()
+    
+    def test_events(self):
+        # The limits still shrink to the events of the diagram
+        self.diagram.set_params(t=0)
+        self.diagram.template(
+            self.diagram.gradient, "G", 1, 1, center=self.diagram.params.t)
+        self.diagram.set_params(t=40)
+        self.assertGreaterEqual(self.plot.get_xlim()[1], 40.5)
+        self.diagram.set_params(t=5)
+        self.assertLess(self.plot.get_xlim()[1], 40.5)
+        self.assert_curve_visible()
+
+class TestLayout(unittest.TestCase):
+    def setUp(self):
+        self.plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram(self.plot, ["RF", "G", "ADC"])
+        self.diagram.rf_pulse("RF", 1, 1, center=0)
+        self.diagram.annotate("RF", 0.2, 1, "RF")
+        self.diagram.interval(0, 2, -1.5, "TE")
+        self.annotation = self.plot.texts[0]
+        self.lines = self.plot.collections[-1]
+    
+    def top(self):
+        return [x[1, 1] for x in self.lines.get_segments()]
+    
+    def test_hide_channel(self):
+        self.diagram.hide_channel("RF")
+        self.assertFalse(self.annotation.get_visible())
+        numpy.testing.assert_allclose(self.top(), [3.2, 3.2])
+        
+        self.diagram.hide_channel("RF", False)
+        self.assertTrue(self.annotation.get_visible())
+        numpy.testing.assert_allclose(self.top(), [5.4, 5.4])
+    
+    def test_annotate_hidden_channel(self):
+        self.diagram.hide_channel("G")
+        self.diagram.annotate("G", 0, 1, "G")
+        self.assertFalse(self.plot.texts[-1].get_visible())
+    
+    def test_add_channel(self):
+        self.diagram.add_channel("Gz")
+        numpy.testing.assert_allclose(self.top(), [7.6, 7.6])
+
+class TestSample(unittest.TestCase):
+    def setUp(self):
+        plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram(plot, ["G"])
+        self.diagram.gradient("G", 2, 1, ramp=0.1, begin=0)
+    
+    def test_grid(self):
+        # Samples from the begin to the end of the gradient
+        times, values = self.diagram.sample("G", 0.05)
+        self.assertEqual(len(times), 45)
+        self.assertAlmostEqual(times[-1], 2.2)
+        numpy.testing.assert_allclose(
+            values[[0, 1, 2, 22, -1]], [0, 0.5, 1, 1, 0])
+        
+        # 0.7/0.1 < 7
+        times, values = self.diagram.sample("G", 0.1, 0, 0.7)
+        self.assertEqual(len(times), 8)
+        self.assertAlmostEqual(times[-1], 0.7)
+    
+    def test_window(self):
+        times, values = self.diagram.sample("G", 0.1, 1, 3)
+        self.assertEqual(len(times), 21)
+        numpy.testing.assert_allclose(values[[0, 11, 12, 20]], [1, 1, 0, 0])
+    
+    def test_empty(self):
+        times, values = self.diagram.sample("G", 0.1, kind=mrsd.RFPulse)
+        self.assertEqual(len(times), 23)
+        self.assertFalse(values.any())
+
+if __name__ == "__main__":
+    unittest.main()
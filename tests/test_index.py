@@ -0,0 +1,151 @@
+import random
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure
+import mrsd
+import mrsd.index
+import numpy
+
+class TestIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+        self.index = mrsd.index.IntervalIndex()
+        # Small blocks, so that they are split and merged by the tests
+        self.index.block_size = 4
+        # Intervals of the index, by row
+        self.intervals = {}
+    
+    def insert(self, row, begin, end):
+        self.index.insert(row, begin, end)
+        self.intervals[row] = (begin, end)
+    
+    def remove(self, row):
+        self.index.remove(row, self.intervals.pop(row)[0])
+    
+    def fill(self, count):
+        for row in range(count):
+            begin = self.random.uniform(0, 100)
+            self.insert(row, begin, begin+self.random.uniform(0, 2))
+    
+    def expected(self, begin, end):
+        rows = [
+            row for row, (start, stop) in self.intervals.items()
+            if start <= end and stop >= begin]
+        return sorted(rows, key=lambda x: (self.intervals[x][0], x))
+    
+    def check(self):
+        self.assertEqual(len(self.index), len(self.intervals))
+        self.assertEqual(
+            self.index.rows(), self.expected(-numpy.inf, numpy.inf))
+        for _ in range(50):
+            begin = self.random.uniform(-5, 105)
+            end = begin + self.random.choice([0, 0.1, 1, 10])
+            self.assertEqual(
+                self.index.window(begin, end), self.expected(begin, end))
+    
+    def test_empty(self):
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.rows(), [])
+        self.assertEqual(self.index.window(0, 1), [])
+    
+    def test_window(self):
+        self.fill(200)
+        self.assertGreater(len(self.index._blocks), 10)
+        self.check()
+    
+    def test_stabbing(self):
+        self.insert(0, 0, 1)
+        self.insert(1, 1, 2)
+        self.insert(2, 3, 3)
+        self.assertEqual(self.index.window(1, 1), [0, 1])
+        self.assertEqual(self.index.window(2.5, 2.5), [])
+        self.assertEqual(self.index.window(3, 3), [2])
+    
+    def test_long_event(self):
+        self.fill(200)
+        # Longer than all blocks, and starting in the first one
+        self.insert(200, -1, 1000)
+        self.check()
+        self.assertIn(200, self.index.window(99, 99))
+        
+        # The maximal end times decrease when it is removed
+        self.remove(200)
+        self.check()
+        self.assertEqual(self.index.window(500, 600), [])
+    
+    def test_remove(self):
+        self.fill(200)
+        for row in self.random.sample(range(200), 150):
+            self.remove(row)
+        self.check()
+        for row in list(self.intervals):
+            self.remove(row)
+        self.check()
+        self.assertEqual(self.index._blocks, [])
+    
+    def test_update(self):
+        self.fill(200)
+        for row in self.random.sample(range(200), 100):
+            self.remove(row)
+            begin = self.random.uniform(0, 100)
+            self.insert(row, begin, begin+self.random.uniform(0, 5))
+        self.check()
+    
+    def test_equal_begins(self):
+        for row in range(50):
+            self.insert(row, 1, 1+row)
+        self.check()
+        self.assertEqual(self.index.window(30, 30), list(range(29, 50)))
+
+class TestEventTable(unittest.TestCase):
+    def setUp(self):
+        plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram(plot, ["RF", "G"])
+        with self.diagram.batch():
+            for index in range(100):
+                self.diagram.gradient("G", 1, 1, ramp=0.1, begin=2*index)
+            self.diagram.rf_pulse("RF", 10, 1, begin=0)
+        self.long = self.diagram.gradient("G", 150, 0.5, begin=20)
+    
+    def test_at(self):
+        events = self.diagram.at("G", 21)
+        self.assertEqual(len(events), 2)
+        self.assertIs(events[1], self.long)
+        self.assertEqual(self.diagram.at("G", 199.5), [])
+    
+    def test_events(self):
+        events = self.diagram.events("G", begin=100.5, end=104)
+        # Sorted by row
+        self.assertEqual([x.begin for x in events], [100, 102, 104, 20])
+        events = self.diagram.events(kind=mrsd.RFPulse, begin=5)
+        self.assertEqual(len(events), 1)
+    
+    def test_move(self):
+        self.long.move(100)
+        self.assertEqual(self.diagram.at("G", 21)[0].begin, 20)
+        self.assertIs(self.diagram.at("G", 250)[0], self.long)
+    
+    def test_remove(self):
+        self.long.remove()
+        self.assertEqual(len(self.diagram.at("G", 21)), 1)
+        self.assertEqual(len(self.diagram.events("G")), 100)
+    
+    def test_overlaps(self):
+        # The long gradient overlaps the gradients from 20 to 168
+        overlaps = self.diagram.overlaps("G")
+        self.assertEqual(len(overlaps), 75)
+        self.assertTrue(all(self.long in x for x in overlaps))
+        
+        # Events which only touch do not overlap
+        first = self.diagram.events("G")[0]
+        self.diagram.gradient("G", 0.5, 1, begin=first.end)
+        self.assertEqual(len(self.diagram.overlaps("G")), 75)
+        self.diagram.gradient("G", 0.5, 1, begin=1)
+        self.assertEqual(len(self.diagram.overlaps("G")), 77)
+        self.assertEqual(self.diagram.overlaps("RF"), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure
+import mrsd
+import numpy
+
+class TestMoments(unittest.TestCase):
+    def setUp(self):
+        plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram(plot, ["Gx", "Gy", "RF"])
+    
+    def test_trapezoid(self):
+        # Area: amplitude × (ramp_up/2 + flat_top + ramp_down/2)
+        self.diagram.gradient(
+            "Gx", 2, 0.5, ramp_up=0.4, ramp_down=0.2, begin=1)
+        moment = self.diagram.moment("Gx", [0, 1, 1.2, 1.4, 3.4, 3.6, 10])
+        numpy.testing.assert_allclose(
+            moment, [0, 0, 0.5*0.2**2/(2*0.4), 0.1, 1.1, 1.15, 1.15])
+    
+    def test_first_moment(self):
+        # Rectangle: area × center, triangle: area × center of mass
+        self.diagram.gradient("Gx", 2, 1, begin=1)
+        self.diagram.gradient("Gy", 0, 1, ramp_up=1, ramp_down=0, begin=0)
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gx", [10], 1), [2*2])
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gy", [10], 1), [0.5*2/3])
+    
+    def test_sum(self):
+        # Cumulative sum of several gradients, at unsorted times
+        self.diagram.gradient("Gx", 1, 1, ramp=0.5, begin=0)
+        self.diagram.gradient("Gx", 1, -2, ramp=0.5, begin=3)
+        self.diagram.gradient("Gx", 1, 1, ramp=0.5, begin=2.5)
+        moment = self.diagram.moment("Gx", [[10, 2.5], [0, 2]])
+        numpy.testing.assert_allclose(moment, [[0, 1.5], [0, 1.5]])
+    
+    def test_kind(self):
+        # Multi-gradients are integrated as their maximal trapezoid, RF pulses
+        # are ignored
+        self.diagram.gradient("Gx", 1, 1, begin=0)
+        self.diagram.multi_gradient("Gx", 1, 2, ramp=0.5, begin=2)
+        self.diagram.rf_pulse("Gx", 1, 1, begin=4)
+        numpy.testing.assert_allclose(self.diagram.moment("Gx", [10]), [4])
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gx", [10], kind=mrsd.Gradient), [1])
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gx", [10], kind=mrsd.MultiGradient), [3])
+    
+    def test_sampled_gradient(self):
+        # Triangle drawn by its samples
+        envelope = mrsd.array_envelope([0, 1, 0], None)
+        self.diagram.sampled_gradient("Gx", 2, 0.5, envelope, begin=1)
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gx", [2, 3]), [0.25, 0.5])
+        numpy.testing.assert_allclose(
+            self.diagram.moment("Gx", [3], 1), [0.5*2])
+    
+    def test_kspace(self):
+        self.diagram.gradient("Gx", 1, 1, begin=0)
+        self.diagram.gradient("Gy", 2, -1, begin=0)
+        kspace = self.diagram.kspace([0.5, 1, 2], ["Gx", "Gy"], gamma=2)
+        numpy.testing.assert_allclose(
+            kspace, [[1, -1], [2, -2], [2, -4]])
+    
+    def test_order(self):
+        with self.assertRaises(Exception):
+            self.diagram.moment("Gx", [0], 2)
+
+if __name__ == "__main__":
+    unittest.main()
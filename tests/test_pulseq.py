@@ -0,0 +1,89 @@
+import os
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure
+import mrsd
+import mrsd.pulseq
+import numpy
+
+# Hand-written Pulseq 1.4 sequence: two repetitions of a gradient echo, the
+# second one with an arbitrary phase-encoding gradient
+path = os.path.join(os.path.dirname(__file__), "data", "sequence.seq")
+
+class TestDecompress(unittest.TestCase):
+    def test_uncompressed(self):
+        samples = mrsd.pulseq.decompress([0.2, 0.6, 1, 0.6, 0.2], 5)
+        numpy.testing.assert_allclose(samples, [0.2, 0.6, 1, 0.6, 0.2])
+    
+    def test_compressed(self):
+        samples = mrsd.pulseq.decompress([0, 0.01, 0.01, 96, -1], 100)
+        numpy.testing.assert_allclose(
+            samples, [*(0.01*numpy.arange(99)), -0.02], atol=1e-12)
+    
+    def test_invalid(self):
+        with self.assertRaises(Exception):
+            mrsd.pulseq.decompress([0, 0.01, 0.01, 96, -1], 99)
+
+class TestRead(unittest.TestCase):
+    def test_sequence(self):
+        sequence = mrsd.pulseq.read(path)
+        self.assertEqual(len(sequence), 14)
+        self.assertEqual(len(sequence.events("RF", "rf_pulse")), 2)
+        self.assertEqual(len(sequence.events("ADC", "adc")), 2)
+        self.assertEqual(
+            [x.kind for x in sequence.events("Gy")],
+            ["gradient", "sampled_gradient"])
+        
+        # Amplitudes normalized per channel
+        self.assertEqual(
+            [x.amplitude for x in sequence.events("Gx")], [-1, 0.8]*2)
+        numpy.testing.assert_allclose(
+            [x.begin for x in sequence.events("Gz")], [0, 3, 11, 14])
+    
+    def test_blocks(self):
+        sequence = mrsd.pulseq.read(path, blocks=(2, 3))
+        self.assertEqual(len(sequence), 5)
+        numpy.testing.assert_allclose(sequence.begin, 3)
+        numpy.testing.assert_allclose(sequence.end, 9.2)
+    
+    def test_time_window(self):
+        sequence = mrsd.pulseq.read(path, begin=1, end=2)
+        self.assertEqual(len(sequence), 2)
+        self.assertEqual(
+            [x.kind for x in sequence], ["rf_pulse", "gradient"])
+    
+    def test_channels(self):
+        sequence = mrsd.pulseq.read(path, channels={"gy": None, "gz": "Gs"})
+        self.assertEqual(sequence.channels, ["RF", "Gx", "Gs", "ADC"])
+        self.assertEqual(len(sequence.events("Gs")), 4)
+
+class TestLoad(unittest.TestCase):
+    def setUp(self):
+        plot = matplotlib.figure.Figure().add_subplot()
+        self.diagram = mrsd.Diagram.load(plot, path)
+    
+    def test_stats(self):
+        self.assertEqual(
+            self.diagram.stats()["events"],
+            {"RFPulse": 2, "Gradient": 9, "SampledGradient": 1, "ADC": 2})
+    
+    def test_arbitrary_gradient(self):
+        gradients = self.diagram.events("Gy", mrsd.Gradient)
+        self.assertEqual(len(gradients), 2)
+        self.assertIsInstance(gradients[1], mrsd.SampledGradient)
+        
+        # Phase encoding of the first repetition, then of the second one
+        moment = self.diagram.moment("Gy", [9, 20])
+        numpy.testing.assert_allclose(moment, [1.1, 1.1-0.3233])
+        
+        # Sampled and integrated waveforms
+        times, values = self.diagram.sample(
+            "Gy", 1e-3, 13.5, 15.5, mrsd.Gradient)
+        numpy.testing.assert_allclose(
+            numpy.sum(values)*1e-3, -0.3233, atol=1e-6)
+
+if __name__ == "__main__":
+    unittest.main()
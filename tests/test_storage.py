@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure
+import matplotlib.patches
+import mrsd
+import numpy
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.diagram = self.build(False)
+        self.directory = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.directory.cleanup()
+    
+    def build(self, collections):
+        plot = matplotlib.figure.Figure().add_subplot()
+        diagram = mrsd.Diagram(plot, ["RF", "Gx", "Gy", "Signal"], collections)
+        
+        diagram.sinc_pulse("RF", 1, 1, center=0, lobes=2, apodization="hann")
+        diagram.gaussian_pulse("RF", 1, 0.5, center=3, sd=0.2)
+        diagram.hard_pulse("RF", 0.5, -0.5, center=6, ec="C1")
+        diagram.rf_pulse(
+            "RF", 2, 1, mrsd.array_envelope([0, 0.5, 1, 0.2, 0]), begin=8)
+        diagram.gradient("Gx", 2, -0.5, ramp_up=0.1, ramp_down=0.3, begin=1)
+        diagram.multi_gradient("Gy", 1, 1, ramp=0.2, steps=3, begin=1)
+        diagram.sampled_gradient(
+            "Gy", 2, 0.8, mrsd.array_envelope([0, 1, -1, 0], None), begin=4,
+            linestyle="--")
+        diagram.readout("Signal", "Gx", 3, ramp=0.1, center=5)
+        event = diagram.gradient("Gx", 1, 1, begin=10, offset=[0.5, 0.2])
+        event.set_visible(False)
+        
+        diagram.annotate("RF", 0.2, 1, r"$\alpha$", color="C2")
+        diagram.interval(0, 5, -1.5, "TE")
+        diagram.hide_channel("Gy")
+        
+        return diagram
+    
+    def round_trip(self, name, diagram=None):
+        diagram = diagram or self.diagram
+        path = os.path.join(self.directory.name, name)
+        diagram.save(path)
+        plot = matplotlib.figure.Figure().add_subplot()
+        return mrsd.Diagram.load(plot, path)
+    
+    def assert_equal(self, diagram, loaded):
+        self.assertEqual(list(loaded._channels), list(diagram._channels))
+        self.assertEqual(
+            [x.visible for x in loaded._channels.values()],
+            [x.visible for x in diagram._channels.values()])
+        
+        for channel in diagram._channels:
+            events = diagram.events(channel)
+            loaded_events = loaded.events(channel)
+            self.assertEqual(len(loaded_events), len(events))
+            for event, loaded_event in zip(events, loaded_events):
+                self.assertIs(type(loaded_event), type(event))
+                for name in ["begin", "duration", "amplitude", "end"]:
+                    self.assertAlmostEqual(
+                        getattr(loaded_event, name), getattr(event, name))
+                numpy.testing.assert_allclose(
+                    loaded_event.offset, event.offset)
+                numpy.testing.assert_allclose(
+                    loaded_event.get_path().vertices,
+                    event.get_path().vertices)
+                for name in ["edgecolor", "linestyle", "visible"]:
+                    getter = getattr(matplotlib.patches.Patch, f"get_{name}")
+                    self.assertEqual(getter(loaded_event), getter(event))
+        
+        self.assertEqual(loaded._annotations, diagram._annotations)
+        self.assertEqual(loaded._intervals, diagram._intervals)
+    
+    def test_json(self):
+        self.assert_equal(self.diagram, self.round_trip("diagram.json"))
+    
+    def test_npz(self):
+        self.assert_equal(self.diagram, self.round_trip("diagram.npz"))
+    
+    def test_collections(self):
+        diagram = self.build(True)
+        loaded = self.round_trip("diagram.npz", diagram)
+        self.assertTrue(loaded._use_collections)
+        self.assert_equal(diagram, loaded)
+    
+    def test_format(self):
+        path = os.path.join(self.directory.name, "diagram.json")
+        with open(path, "w") as fd:
+            fd.write("{}")
+        with self.assertRaises(Exception):
+            mrsd.Diagram.load(matplotlib.figure.Figure().add_subplot(), path)
+
+if __name__ == "__main__":
+    unittest.main()